@@ -0,0 +1,31 @@
+"""documents content_hash for content-addressed storage
+
+Revision ID: 20261018_document_content_hash
+Revises: 20261018_query_shape_indexes
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_document_content_hash'
+down_revision: Union[str, Sequence[str], None] = '20261018_query_shape_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # الوثائق القديمة تبقى بدون hash حتى تشغيل app/scripts/migrate_document_blobs.py
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_documents_content_hash', 'documents', ['content_hash'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_content_hash', table_name='documents', if_exists=True)
+    op.drop_column('documents', 'content_hash')
@@ -0,0 +1,37 @@
+"""license expiry notices and status/expiry index
+
+Revision ID: 20261018_license_expiry_notices
+Revises: 20261018_add_dashboard_counters
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_license_expiry_notices'
+down_revision: Union[str, Sequence[str], None] = '20261018_add_dashboard_counters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('license_expiry_notices',
+        sa.Column('license_id', sa.Integer(), nullable=False),
+        sa.Column('tier', sa.String(length=10), nullable=False),
+        sa.Column('expiry_date', sa.Date(), nullable=False),
+        sa.Column('notified_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['license_id'], ['licenses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('license_id', 'tier', 'expiry_date')
+    )
+    op.create_index('ix_licenses_status_expiry_date', 'licenses', ['status', 'expiry_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_licenses_status_expiry_date', table_name='licenses')
+    op.drop_table('license_expiry_notices')
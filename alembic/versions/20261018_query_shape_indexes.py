@@ -0,0 +1,40 @@
+"""indexes for the current query shapes
+
+Revision ID: 20261018_query_shape_indexes
+Revises: 20261018_search_index
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_query_shape_indexes'
+down_revision: Union[str, Sequence[str], None] = '20261018_search_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (اسم الفهرس، الجدول، الأعمدة)
+INDEXES = [
+    ('ix_licenses_expiry_date', 'licenses', ['expiry_date']),
+    ('ix_licenses_employee_id', 'licenses', ['employee_id']),
+    ('ix_employees_company_id', 'employees', ['company_id']),
+    ('ix_documents_entity_type_entity_id', 'documents', ['entity_type', 'entity_id']),
+    ('ix_alerts_is_read', 'alerts', ['is_read']),
+    ('ix_tasks_assigned_to_id', 'tasks', ['assigned_to_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,55 @@
+"""documents extracted_text and full-text search index
+
+Revision ID: 20261018_search_index
+Revises: 20261018_license_expiry_notices
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261018_search_index'
+down_revision: Union[str, Sequence[str], None] = '20261018_license_expiry_notices'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# نسخة ثابتة من تعريف الفهرس في app/services/search_index.py
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "entity_type UNINDEXED, entity_id UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+]
+
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS search_index ("
+    "entity_type VARCHAR(20) NOT NULL, "
+    "entity_id INTEGER NOT NULL, "
+    "title TEXT, "
+    "body TEXT, "
+    "document tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED, "
+    "PRIMARY KEY (entity_type, entity_id))",
+    "CREATE INDEX IF NOT EXISTS ix_search_index_document ON search_index USING GIN (document)",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('extracted_text', sa.Text(), nullable=True))
+
+    # الفهرس يُملأ عند بدء التطبيق إذا كان فارغاً
+    dialect = op.get_bind().dialect.name
+    statements = SQLITE_DDL if dialect == 'sqlite' else POSTGRES_DDL if dialect == 'postgresql' else []
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TABLE IF EXISTS search_index')
+    op.drop_column('documents', 'extracted_text')
@@ -1,111 +1,626 @@
-from typing import Any, Optional
-import json
+from typing import Any, Optional, Dict, Iterable, List
 import hashlib
-from datetime import datetime, timedelta
+import inspect
+import string
+import uuid
+import pickle
+import sys
+import threading
+import time
 import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 
-# Simple in-memory cache (يمكن استبداله بـ Redis لاحقاً)
-_cache_store = {}
-_cache_expiry = {}
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _estimate_size(value: Any, _depth: int = 0) -> int:
+    """تقدير تقريبي لحجم القيمة في الذاكرة بالبايت"""
+    size = sys.getsizeof(value)
+    if _depth >= 3:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += _estimate_size(k, _depth + 1) + _estimate_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _estimate_size(item, _depth + 1)
+    return size
+
+
+class CacheBackend:
+    """الواجهة المشتركة لمخازن الـ cache"""
+
+    name = "base"
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """جلب عدة قيم دفعة واحدة دون احتسابها في الإحصائيات"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, expire_seconds: int = 300):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def cleanup_expired(self) -> int:
+        """إزالة البيانات منتهية الصلاحية وإرجاع عددها"""
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Cache داخل العملية بسياسة LRU مع انتهاء صلاحية وحد أقصى للعناصر والحجم"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, expires_at, size) مرتبة من الأقدم استخداماً إلى الأحدث
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key: str):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, _ = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        now = time.monotonic()
+        result = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None or now >= entry[1]:
+                    result.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    result.append(entry[0])
+        return result
+
+    def set(self, key: str, value: Any, expire_seconds: int = 300):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            # قيمة أكبر من ميزانية الـ cache بالكامل
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+            self._data[key] = (value, time.monotonic() + expire_seconds, size)
+            self._bytes += size
+
+            # إخراج الأقدم استخداماً حتى نعود ضمن الحدود - O(1) لكل عنصر
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def cleanup_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired_keys = [
+                key for key, (_, expires_at, _) in self._data.items()
+                if now >= expires_at
+            ]
+            for key in expired_keys:
+                self._remove(key)
+            self.expirations += len(expired_keys)
+        return len(expired_keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache مشترك بين جميع العمليات عبر Redis
+
+    انتهاء الصلاحية يتم عبر TTL في Redis، والإخراج عند امتلاء الذاكرة
+    يعتمد على إعداد maxmemory-policy في الخادم (يفضل allkeys-lru).
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "workers:cache:"):
+        import redis
+
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(
+            url,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+        )
+        # التأكد من إمكانية الاتصال قبل اعتماد هذا المخزن
+        self.client.ping()
+        self._error_class = redis.RedisError
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self.client.get(self._key(key))
+        except self._error_class as e:
+            self.errors += 1
+            logger.warning(f"Redis cache get error: {e}")
+            return None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        try:
+            raws = self.client.mget([self._key(key) for key in keys])
+        except self._error_class as e:
+            self.errors += 1
+            logger.warning(f"Redis cache mget error: {e}")
+            return [None] * len(keys)
+        return [pickle.loads(raw) if raw is not None else None for raw in raws]
+
+    def set(self, key: str, value: Any, expire_seconds: int = 300):
+        try:
+            self.client.set(
+                self._key(key),
+                pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                ex=max(1, int(expire_seconds)),
+            )
+        except (self._error_class, pickle.PicklingError, TypeError) as e:
+            self.errors += 1
+            logger.warning(f"Redis cache set error: {e}")
+
+    def delete(self, key: str):
+        try:
+            self.client.delete(self._key(key))
+        except self._error_class as e:
+            self.errors += 1
+            logger.warning(f"Redis cache delete error: {e}")
+
+    def clear(self):
+        try:
+            batch = []
+            for key in self.client.scan_iter(match=f"{self.prefix}*", count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    self.client.delete(*batch)
+                    batch = []
+            if batch:
+                self.client.delete(*batch)
+        except self._error_class as e:
+            self.errors += 1
+            logger.warning(f"Redis cache clear error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        result = {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+        try:
+            memory = self.client.info("memory")
+            result["bytes"] = memory.get("used_memory")
+            result["max_bytes"] = memory.get("maxmemory")
+            stats = self.client.info("stats")
+            result["evictions"] = stats.get("evicted_keys")
+        except self._error_class:
+            pass
+        return result
+
+
+def create_cache_backend() -> CacheBackend:
+    """اختيار مخزن الـ cache حسب الإعدادات (Redis إذا كان متاحاً)"""
+    backend = settings.CACHE_BACKEND.lower()
+
+    if backend in ("auto", "redis") and settings.REDIS_URL:
+        try:
+            return RedisCacheBackend(settings.REDIS_URL, prefix=settings.CACHE_KEY_PREFIX)
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable, falling back to memory cache: {e}")
+
+    return MemoryCacheBackend(
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        max_bytes=settings.CACHE_MAX_BYTES,
+    )
+
+
+# مدة بقاء رموز الـ tags، يجب أن تكون أطول من أي مدة cache
+TAG_TOKEN_TTL = 7 * 24 * 3600
+_TAG_KEY_PREFIX = "__tag__:"
+
+
+def _tag_scopes(tag: str) -> List[str]:
+    """الـ tag مع جميع النطاقات الأعلى منه: company:5 -> [company:*, company:5]"""
+    parts = tag.split(":")
+    scopes = [":".join(parts[:i]) + ":*" for i in range(1, len(parts))]
+    scopes.append(tag)
+    return scopes
+
+
+class _TaggedValue:
+    """قيمة مخزنة مع رموز الـ tags الخاصة بها وقت الكتابة"""
+
+    __slots__ = ("value", "tokens")
+
+    def __init__(self, value: Any, tokens: Dict[str, str]):
+        self.value = value
+        self.tokens = tokens
+
+    def __getstate__(self):
+        return (self.value, self.tokens)
+
+    def __setstate__(self, state):
+        self.value, self.tokens = state
+
 
 class CacheManager:
-    def __init__(self):
-        self.store = _cache_store
-        self.expiry = _cache_expiry
-    
+    """واجهة الـ cache للتطبيق
+
+    يدعم إبطال القيم عبر tags: كل tag له رمز مخزن في نفس المخزن، وتُحفظ
+    رموز الـ tags مع القيمة عند كتابتها. إبطال tag يعني حذف رمزه، فتصبح كل
+    القيم المرتبطة به غير صالحة عند قراءتها. الـ tag بصيغة "stats:*" يبطل
+    كل الـ tags التي تبدأ بـ "stats:".
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or create_cache_backend()
+
     def _generate_key(self, prefix: str, *args, **kwargs) -> str:
         """توليد مفتاح cache فريد"""
         key_data = f"{prefix}:{args}:{sorted(kwargs.items())}"
         return hashlib.md5(key_data.encode()).hexdigest()
-    
-    def set(self, key: str, value: Any, expire_seconds: int = 300):
-        """حفظ قيمة في الـ cache مع انتهاء صلاحية"""
-        self.store[key] = value
-        self.expiry[key] = datetime.now() + timedelta(seconds=expire_seconds)
-    
+
+    def _tag_tokens(self, tags: Iterable[str]) -> Dict[str, str]:
+        """جلب رموز الـ tags الحالية وإنشاء الرموز غير الموجودة"""
+        scopes = list(dict.fromkeys(scope for tag in tags for scope in _tag_scopes(tag)))
+        current = self.backend.get_many([_TAG_KEY_PREFIX + scope for scope in scopes])
+
+        tokens = {}
+        for scope, token in zip(scopes, current):
+            if token is None:
+                token = uuid.uuid4().hex
+                self.backend.set(_TAG_KEY_PREFIX + scope, token, TAG_TOKEN_TTL)
+            tokens[scope] = token
+        return tokens
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        expire_seconds: int = 300,
+        tags: Optional[Iterable[str]] = None,
+        tag_tokens: Optional[Dict[str, str]] = None,
+    ):
+        """حفظ قيمة في الـ cache مع انتهاء صلاحية وtags اختيارية للإبطال
+
+        tag_tokens: رموز الـ tags كما قُرئت قبل حساب القيمة، فإذا أُبطل أحدها أثناء
+        الحساب تبقى القيمة غير صالحة بدلاً من ربطها برمز جديد.
+        """
+        if tag_tokens is None and tags:
+            tag_tokens = self._tag_tokens(tags)
+        if tag_tokens:
+            value = _TaggedValue(value, tag_tokens)
+        self.backend.set(key, value, expire_seconds)
+
     def get(self, key: str) -> Optional[Any]:
         """جلب قيمة من الـ cache"""
-        if key not in self.store:
-            return None
-        
-        # التحقق من انتهاء الصلاحية
-        if key in self.expiry and datetime.now() > self.expiry[key]:
-            del self.store[key]
-            del self.expiry[key]
+        value = self.backend.get(key)
+        if not isinstance(value, _TaggedValue):
+            return value
+
+        scopes = list(value.tokens)
+        current = self.backend.get_many([_TAG_KEY_PREFIX + scope for scope in scopes])
+        if any(value.tokens[scope] != token for scope, token in zip(scopes, current)):
+            # تم إبطال أحد الـ tags بعد كتابة القيمة
+            self.backend.delete(key)
             return None
-        
-        return self.store[key]
-    
+        return value.value
+
+    def invalidate_tags(self, *tags: str):
+        """إبطال جميع القيم المرتبطة بالـ tags المحددة"""
+        for tag in set(tags):
+            self.backend.delete(_TAG_KEY_PREFIX + tag)
+
     def delete(self, key: str):
         """حذف قيمة من الـ cache"""
-        if key in self.store:
-            del self.store[key]
-        if key in self.expiry:
-            del self.expiry[key]
-    
+        self.backend.delete(key)
+
     def clear(self):
         """مسح جميع البيانات من الـ cache"""
-        self.store.clear()
-        self.expiry.clear()
-    
-    def cleanup_expired(self):
+        self.backend.clear()
+
+    def cleanup_expired(self) -> int:
         """إزالة البيانات منتهية الصلاحية"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, expiry_time in self.expiry.items()
-            if now > expiry_time
-        ]
-        
-        for key in expired_keys:
-            if key in self.store:
-                del self.store[key]
-            del self.expiry[key]
+        return self.backend.cleanup_expired()
+
+    def stats(self) -> Dict[str, Any]:
+        """إحصائيات الـ cache (الإصابات، الإخفاقات، الإخراج، الحجم)"""
+        stats = self.backend.stats()
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        stats["hit_ratio"] = round(stats.get("hits", 0) / lookups, 4) if lookups else 0.0
+        return stats
 
 # إنشاء instance global
 cache = CacheManager()
 
-def cached(expire_seconds: int = 300, prefix: str = "default"):
-    """Decorator لـ caching نتائج الدوال"""
+# الحسابات الجارية حالياً لكل مفتاح (single-flight)
+_inflight_async: Dict[str, asyncio.Task] = {}
+_inflight_sync: Dict[str, "_InFlightCall"] = {}
+_inflight_lock = threading.Lock()
+
+# مراجع للتحديثات الخلفية حتى لا يتم جمعها قبل انتهائها
+_background_refreshes: set = set()
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+_MISSING = object()
+
+
+class _InFlightCall:
+    """حساب متزامن جارٍ ينتظره باقي الطلبات على نفس المفتاح"""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _read_entry(cache_key: str):
+    """قراءة قيمة مخزنة بواسطة cached وإرجاع (القيمة، هل هي قديمة)"""
+    entry = cache.get(cache_key)
+    if entry is None:
+        return _MISSING, False
+    value, fresh_until = entry
+    return value, time.time() >= fresh_until
+
+
+class _CachePolicy:
+    """إعدادات cached لدالة معينة"""
+
+    __slots__ = ("func", "expire_seconds", "stale_seconds", "tag_templates", "signature")
+
+    def __init__(self, func, expire_seconds: int, stale_seconds: int, tags):
+        self.func = func
+        self.expire_seconds = expire_seconds
+        self.stale_seconds = stale_seconds
+        self.tag_templates = tags
+        self.signature = inspect.signature(func)
+
+        if tags and not callable(tags):
+            # التحقق مبكراً من أن كل حقل في الـ tags هو معامل في الدالة
+            formatter = string.Formatter()
+            for template in tags:
+                for _, field, _, _ in formatter.parse(template):
+                    if field and field not in self.signature.parameters:
+                        raise ValueError(
+                            f"Cache tag '{template}' references unknown parameter '{field}' of {func.__name__}"
+                        )
+
+    def resolve_tags(self, args, kwargs) -> Optional[List[str]]:
+        """تحويل قوالب الـ tags إلى قيم فعلية حسب معاملات الاستدعاء"""
+        if not self.tag_templates:
+            return None
+        if callable(self.tag_templates):
+            return list(self.tag_templates(*args, **kwargs))
+
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return [template.format(**bound.arguments) for template in self.tag_templates]
+
+    def read_tag_tokens(self, args, kwargs) -> Optional[Dict[str, str]]:
+        """رموز الـ tags قبل تنفيذ الدالة، حتى لا تُعتبر قيمة حُسبت قبل إبطال صالحةً"""
+        tags = self.resolve_tags(args, kwargs)
+        return cache._tag_tokens(tags) if tags else None
+
+    def store(self, cache_key: str, value: Any, tag_tokens: Optional[Dict[str, str]]):
+        """تخزين القيمة مع وقت الصلاحية، وإبقاؤها متاحة كقيمة قديمة لمدة stale_seconds"""
+        cache.set(
+            cache_key,
+            (value, time.time() + self.expire_seconds),
+            self.expire_seconds + self.stale_seconds,
+            tag_tokens=tag_tokens,
+        )
+
+
+async def _run_async(cache_key: str, policy: _CachePolicy, args, kwargs):
+    tag_tokens = policy.read_tag_tokens(args, kwargs)
+    result = await policy.func(*args, **kwargs)
+    policy.store(cache_key, result, tag_tokens)
+    return result
+
+
+def _finish_async(cache_key: str, task: asyncio.Task):
+    if _inflight_async.get(cache_key) is task:
+        del _inflight_async[cache_key]
+    if not task.cancelled():
+        task.exception()  # تجنب تحذير "exception was never retrieved" إذا أُلغي كل المنتظرين
+
+
+async def _compute_async(cache_key: str, policy: _CachePolicy, args, kwargs):
+    """تنفيذ الدالة مرة واحدة لكل مفتاح، وباقي الطلبات تنتظر نفس النتيجة
+
+    الحساب يعمل في task مستقلة، وكل طلب (بما فيها الأول) ينتظرها عبر shield،
+    فإلغاء أحد الطلبات (مثلاً انقطاع اتصال العميل) لا يلغي الحساب على الباقين.
+    """
+    task = _inflight_async.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_run_async(cache_key, policy, args, kwargs))
+        _inflight_async[cache_key] = task
+        task.add_done_callback(lambda done: _finish_async(cache_key, done))
+    return await asyncio.shield(task)
+
+
+def _compute_sync(cache_key: str, policy: _CachePolicy, args, kwargs):
+    """النسخة المتزامنة من _compute_async للدوال التي تعمل في threadpool"""
+    with _inflight_lock:
+        call = _inflight_sync.get(cache_key)
+        is_leader = call is None
+        if is_leader:
+            call = _InFlightCall()
+            _inflight_sync[cache_key] = call
+
+    if not is_leader:
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        tag_tokens = policy.read_tag_tokens(args, kwargs)
+        call.result = policy.func(*args, **kwargs)
+        policy.store(cache_key, call.result, tag_tokens)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_sync.pop(cache_key, None)
+        call.event.set()
+
+
+def _refresh_in_background_async(cache_key: str, policy: _CachePolicy, args, kwargs):
+    if cache_key in _inflight_async:
+        return
+
+    async def refresh():
+        try:
+            await _compute_async(cache_key, policy, args, kwargs)
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed for {policy.func.__name__}: {e}")
+
+    task = asyncio.ensure_future(refresh())
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+
+
+def _refresh_in_background_sync(cache_key: str, policy: _CachePolicy, args, kwargs):
+    if cache_key in _inflight_sync:
+        return
+
+    def refresh():
+        try:
+            _compute_sync(cache_key, policy, args, kwargs)
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed for {policy.func.__name__}: {e}")
+
+    _refresh_executor.submit(refresh)
+
+
+def cached(expire_seconds: int = 300, prefix: str = "default", stale_seconds: int = 0, tags=None):
+    """Decorator لـ caching نتائج الدوال
+
+    عند انتهاء صلاحية القيمة يتم حسابها مرة واحدة فقط مهما كان عدد الطلبات
+    المتزامنة. إذا كانت stale_seconds أكبر من صفر تُعاد القيمة القديمة خلال
+    هذه المدة بينما يتم تحديثها في الخلفية (stale-while-revalidate)، لذلك
+    يجب ألا تعتمد الدالة على موارد خاصة بالطلب مثل جلسة قاعدة البيانات.
+
+    tags: قوالب مثل "company:{company_id}" تُملأ من معاملات الدالة، أو دالة
+    تُرجع قائمة الـ tags. تُبطل القيمة عند إبطال أي من هذه الـ tags.
+    """
     def decorator(func):
+        policy = _CachePolicy(func, expire_seconds, stale_seconds, tags)
+
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
             # توليد cache key
             cache_key = cache._generate_key(f"{prefix}_{func.__name__}", *args, **kwargs)
-            
+
             # محاولة جلب النتيجة من الـ cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
+            cached_result, is_stale = _read_entry(cache_key)
+            if cached_result is not _MISSING:
+                if is_stale:
+                    _refresh_in_background_async(cache_key, policy, args, kwargs)
                 return cached_result
-            
+
             # تنفيذ الدالة وحفظ النتيجة
-            result = await func(*args, **kwargs)
-            cache.set(cache_key, result, expire_seconds)
-            
-            return result
-        
+            return await _compute_async(cache_key, policy, args, kwargs)
+
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
             # توليد cache key
             cache_key = cache._generate_key(f"{prefix}_{func.__name__}", *args, **kwargs)
-            
+
             # محاولة جلب النتيجة من الـ cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
+            cached_result, is_stale = _read_entry(cache_key)
+            if cached_result is not _MISSING:
+                if is_stale:
+                    _refresh_in_background_sync(cache_key, policy, args, kwargs)
                 return cached_result
-            
+
             # تنفيذ الدالة وحفظ النتيجة
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, expire_seconds)
-            
-            return result
-        
+            return _compute_sync(cache_key, policy, args, kwargs)
+
         # التحقق من نوع الدالة
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
         else:
             return sync_wrapper
-    
+
     return decorator
 
 # دالة لـ background cleanup
@@ -116,14 +631,38 @@ async def start_cache_cleanup():
         cache.cleanup_expired()
 
 # Cache decorators محددة للتطبيق
-def cache_user_data(expire_seconds: int = 600):
+# الـ tags الافتراضية تتوافق مع ما يبطله app.core.cache_invalidation عند تعديل النماذج
+def _scoped_cache(prefix: str, expire_seconds: int, stale_seconds: int, tags, id_param: str, list_tag: str):
+    def decorator(func):
+        resolved_tags = tags
+        if resolved_tags is None:
+            if id_param in inspect.signature(func).parameters:
+                resolved_tags = (f"{prefix}:{{{id_param}}}",)
+            else:
+                resolved_tags = (list_tag,)
+        return cached(
+            expire_seconds=expire_seconds,
+            prefix=prefix,
+            stale_seconds=stale_seconds,
+            tags=resolved_tags,
+        )(func)
+    return decorator
+
+def cache_user_data(expire_seconds: int = 600, tags=None):
     """Cache بيانات المستخدمين لمدة 10 دقائق"""
-    return cached(expire_seconds=expire_seconds, prefix="user")
+    return _scoped_cache("user", expire_seconds, 0, tags, "user_id", "users")
 
-def cache_company_data(expire_seconds: int = 1800):
+def cache_company_data(expire_seconds: int = 1800, tags=None):
     """Cache بيانات الشركات لمدة 30 دقيقة"""
-    return cached(expire_seconds=expire_seconds, prefix="company")
+    return _scoped_cache("company", expire_seconds, 0, tags, "company_id", "companies")
 
-def cache_statistics(expire_seconds: int = 300):
-    """Cache الإحصائيات لمدة 5 دقائق"""
-    return cached(expire_seconds=expire_seconds, prefix="stats")
+def cache_statistics(expire_seconds: int = 300, stale_seconds: int = 60, tags=None):
+    """Cache الإحصائيات لمدة 5 دقائق مع تقديم القيمة القديمة أثناء التحديث"""
+    def decorator(func):
+        return cached(
+            expire_seconds=expire_seconds,
+            prefix="stats",
+            stale_seconds=stale_seconds,
+            tags=tags or (f"stats:{func.__name__}",),
+        )(func)
+    return decorator
@@ -0,0 +1,165 @@
+"""
+إبطال الـ cache تلقائياً عند تعديل النماذج
+تُجمع الـ tags المتأثرة في after_flush وتُبطل بعد نجاح الـ commit فقط
+"""
+
+from itertools import chain
+from typing import Callable, Dict, Iterable, Set
+import logging
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Mapper, Session
+
+from app.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_PENDING_TAGS_KEY = "cache_invalidation_tags"
+
+
+def _values(obj, attr: str) -> Set:
+    """القيمة الحالية والقيمة السابقة (إن تغيرت) لخاصية معينة"""
+    history = inspect(obj).attrs[attr].history
+    return {value for value in chain(history.added, history.unchanged, history.deleted) if value is not None}
+
+
+def _company_tags(obj) -> Iterable[str]:
+    yield f"company:{obj.id}"
+    yield "companies"
+    yield "stats:*"
+
+
+def _employee_tags(obj) -> Iterable[str]:
+    yield f"employee:{obj.id}"
+    yield "employees"
+    for company_id in _values(obj, "company_id"):
+        yield f"employees:company:{company_id}"
+        yield f"company:{company_id}"
+    yield "stats:*"
+
+
+def _license_tags(obj) -> Iterable[str]:
+    yield f"license:{obj.id}"
+    yield "licenses"
+    for company_id in _values(obj, "company_id"):
+        yield f"licenses:company:{company_id}"
+        yield f"company:{company_id}"
+    for employee_id in _values(obj, "employee_id"):
+        yield f"licenses:employee:{employee_id}"
+    yield "stats:*"
+
+
+def _document_tags(obj) -> Iterable[str]:
+    yield f"document:{obj.id}"
+    yield "documents"
+    entity_type = getattr(obj.entity_type, "value", obj.entity_type)
+    for entity_id in _values(obj, "entity_id"):
+        yield f"documents:{entity_type}:{entity_id}"
+    yield "stats:*"
+
+
+def _alert_tags(obj) -> Iterable[str]:
+    yield f"alert:{obj.id}"
+    yield "alerts"
+    for user_id in _values(obj, "user_id"):
+        yield f"alerts:user:{user_id}"
+
+
+def _task_tags(obj) -> Iterable[str]:
+    yield f"task:{obj.id}"
+    yield "tasks"
+    for user_id in _values(obj, "assigned_to_id"):
+        yield f"tasks:user:{user_id}"
+
+
+def _user_tags(obj) -> Iterable[str]:
+    yield f"user:{obj.id}"
+    yield "users"
+
+
+# الـ tags التي يبطلها تعديل كل جدول
+TAG_BUILDERS: Dict[str, Callable] = {
+    "companies": _company_tags,
+    "employees": _employee_tags,
+    "licenses": _license_tags,
+    "documents": _document_tags,
+    "alerts": _alert_tags,
+    "tasks": _task_tags,
+    "users": _user_tags,
+}
+
+# الـ tags التي تُبطل عند التعديل الجماعي (query.update/delete) لأن الصفوف غير معروفة
+BULK_TAGS: Dict[str, tuple] = {
+    "companies": ("companies", "company:*", "stats:*"),
+    "employees": ("employees", "employee:*", "employees:*", "company:*", "stats:*"),
+    "licenses": ("licenses", "license:*", "licenses:*", "company:*", "stats:*"),
+    "documents": ("documents", "document:*", "documents:*", "stats:*"),
+    "alerts": ("alerts", "alert:*", "alerts:*"),
+    "tasks": ("tasks", "task:*", "tasks:*"),
+    "users": ("users", "user:*"),
+}
+
+
+# الأعمدة التي تحدد tags الصف، تُحمّل قيمتها السابقة عند التعديل لإبطال الـ tags القديمة أيضاً
+ACTIVE_HISTORY_COLUMNS: Dict[str, tuple] = {
+    "employees": ("company_id",),
+    "licenses": ("company_id", "employee_id"),
+    "documents": ("entity_id",),
+    "alerts": ("user_id",),
+    "tasks": ("assigned_to_id",),
+}
+
+
+def _ignore_set(target, value, oldvalue, initiator):
+    pass
+
+
+@event.listens_for(Mapper, "mapper_configured")
+def _enable_active_history(mapper, class_):
+    for column in ACTIVE_HISTORY_COLUMNS.get(getattr(class_, "__tablename__", None), ()):
+        event.listen(getattr(class_, column), "set", _ignore_set, active_history=True)
+
+
+def _pending_tags(session: Session) -> Set[str]:
+    return session.info.setdefault(_PENDING_TAGS_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tags(session: Session, flush_context):
+    """جمع الـ tags المتأثرة بالكائنات التي تم حفظها"""
+    tags = None
+    for obj in chain(session.new, session.dirty, session.deleted):
+        builder = TAG_BUILDERS.get(getattr(obj, "__tablename__", None))
+        if builder is None:
+            continue
+        if tags is None:
+            tags = _pending_tags(session)
+        tags.update(builder(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tags(orm_execute_state):
+    """التعديل الجماعي (update/delete) لا يمر عبر flush لذلك نبطل عائلة الجدول كاملة"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    tablename = getattr(mapper.class_, "__tablename__", None) if mapper is not None else None
+    if tablename in BULK_TAGS:
+        _pending_tags(orm_execute_state.session).update(BULK_TAGS[tablename])
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tags(session: Session):
+    """إبطال الـ tags بعد نجاح الحفظ فقط حتى لا تُقرأ بيانات لم تُحفظ"""
+    tags = session.info.pop(_PENDING_TAGS_KEY, None)
+    if not tags:
+        return
+    try:
+        cache.invalidate_tags(*tags)
+    except Exception as e:
+        logger.error(f"Cache invalidation error: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_tags(session: Session):
+    session.info.pop(_PENDING_TAGS_KEY, None)
@@ -5,6 +5,29 @@ import os
 class Settings(BaseSettings):
     # Database settings
     DATABASE_URL: str = "sqlite:///./workers.db"
+
+    # Connection pool settings
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # ثوانٍ انتظار اتصال متاح قبل الخطأ
+    DB_POOL_RECYCLE: int = 1800  # إعادة فتح الاتصالات الأقدم من هذا (ثوانٍ)
+    DB_POOL_PRE_PING: bool = True  # التحقق من الاتصال قبل استخدامه (PostgreSQL)
+
+    # نسخ القراءة: طلبات GET تقرأ منها، مثال: DATABASE_REPLICA_URLS='["sqlite:///./replica.db"]'
+    DATABASE_REPLICA_URLS: list = []
+    # مدة قراءة العميل من القاعدة الرئيسية بعد أن يكتب (ثوانٍ)
+    DATABASE_REPLICA_STICKY_SECONDS: int = 5
+
+    # SQLite settings
+    SQLITE_JOURNAL_MODE: str = "WAL"  # القراءة لا تنتظر الكتابة
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # آمن مع WAL وأسرع من FULL
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # انتظار القفل بدلاً من "database is locked" فوراً
+    SQLITE_CACHE_SIZE_KB: int = 64000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+
+    # الـ routers التي تستخدم AsyncSession بدلاً من الجلسة المتزامنة
+    # (المدعومة حالياً: companies, employees)، مثال: ASYNC_DB_ROUTERS='["employees"]'
+    ASYNC_DB_ROUTERS: set = set()
     
     # Security settings
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
@@ -25,6 +48,9 @@ class Settings(BaseSettings):
         'pdf', 'doc', 'docx', 'xls', 'xlsx', 
         'jpg', 'jpeg', 'png', 'gif', 'txt'
     }
+    # معاينات الصور وأول صفحة من PDF (WebP) تُنشأ في process pool بعد الرفع
+    THUMBNAILS_ENABLED: bool = True
+    THUMBNAIL_WORKERS: int = 2
     
     # Email settings (optional)
     SMTP_TLS: bool = True
@@ -46,7 +72,52 @@ class Settings(BaseSettings):
     
     # Redis settings (for caching - optional)
     REDIS_URL: Optional[str] = None
-    
+
+    # Cache settings
+    CACHE_BACKEND: str = "auto"  # auto, memory, redis
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 64MB
+    CACHE_KEY_PREFIX: str = "workers:cache:"
+
+    # Rate limiting settings
+    RATE_LIMIT_BACKEND: str = "auto"  # auto, memory, redis
+    RATE_LIMIT_MAX_KEYS: int = 100000  # الحد الأقصى للعملاء المتابعين في الذاكرة
+
+    # WebSocket notifications settings
+    NOTIFY_BACKEND: str = "auto"  # auto, memory, redis
+    NOTIFY_QUEUE_SIZE: int = 100  # الحد الأقصى للرسائل المنتظرة لكل اتصال
+    NOTIFY_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # drop_oldest, disconnect
+    NOTIFY_HEARTBEAT_SECONDS: int = 30
+    NOTIFY_SEND_TIMEOUT: int = 10
+
+    # Dashboard settings
+    # عدادات مخزنة تُحدث مع كل تعديل بدلاً من حساب الإحصائيات من الجداول
+    DASHBOARD_COUNTERS_ENABLED: bool = False
+
+    # Logging settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "app.log"
+    LOG_FORMAT: str = "json"  # json, text
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024  # 10MB لكل ملف قبل التدوير
+    LOG_BACKUP_COUNT: int = 5
+    LOG_BATCH_SIZE: int = 256
+    LOG_QUEUE_SIZE: int = 10000
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0  # نسبة سجلات الطلبات الناجحة التي تُحفظ
+    ACCESS_LOG_SLOW_MS: int = 1000  # الطلبات الأبطأ من هذا تُسجل دائماً
+
+    # SQL query counting (development / tests)
+    # عد استعلامات كل طلب لكشف مشكلة N+1
+    SQL_QUERY_COUNT_ENABLED: bool = False
+    SQL_QUERY_WARN_THRESHOLD: int = 20
+    SQL_QUERY_FAIL_THRESHOLD: int = 0  # 0 = تحذير فقط
+    # قياس زمن الاستعلامات: Server-Timing وجدول أبطأ الاستعلامات (/api/debug/slow-queries)
+    SQL_PROFILING_ENABLED: bool = False
+    SQL_SLOW_QUERY_TOP_N: int = 50
+    SQL_SLOW_QUERY_MS: float = 0  # الاستعلامات الأسرع من هذا لا تدخل الجدول
+
+    # Metrics settings
+    METRICS_ENABLED: bool = True  # /metrics بصيغة Prometheus
+
     # Application settings
     DEBUG: bool = False
     TESTING: bool = False
@@ -0,0 +1,193 @@
+"""
+استجابات تحميل الملفات: طلبات المدى (Range/206) و ETag والطلبات الشرطية
+- ETag قوي من SHA-256 المحتوى للملفات في مخزن الـ blobs، مع Cache-Control immutable
+  (المحتوى لا يتغير أبداً لنفس الـ hash)، وETag ضعيف من الحجم والتاريخ للملفات القديمة
+- If-None-Match / If-Modified-Since ترجع 304 بدون جسم
+- Range بمدى واحد (bytes=start-end أو bytes=-suffix) يرجع 206، و If-Range يرجع الملف
+  كاملاً إذا تغير. المديات المتعددة تُتجاهل ويُرسل الملف كاملاً (مسموح في HTTP)
+- stat واحد للملف يُستخدم للتحقق من وجوده وللحجم والتاريخ
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, Optional, Tuple
+from urllib.parse import quote
+import os
+import stat
+
+import anyio
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+# الملفات خلف تسجيل الدخول، فلا تُحفظ في الـ caches المشتركة
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def stat_file(path: str) -> os.stat_result:
+    """stat واحد للتحقق من وجود الملف وقراءة حجمه وتاريخه"""
+    try:
+        stat_result = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="الملف غير موجود")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="الملف غير موجود")
+    return stat_result
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """مقارنة ضعيفة (If-None-Match): W/"x" يطابق "x" """
+    if header.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def _header_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def is_not_modified(request: Request, etag: str, stat_result: os.stat_result) -> bool:
+    # If-None-Match له الأولوية على If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        since = _header_date(if_modified_since)
+        return since is not None and int(stat_result.st_mtime) <= since
+    return False
+
+
+def _if_range_matches(request: Request, etag: str, stat_result: os.stat_result) -> bool:
+    """If-Range: المدى صالح فقط إذا لم يتغير الملف (مقارنة قوية للـ ETag)"""
+    if_range = request.headers.get("if-range")
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        return not etag.startswith("W/") and if_range == etag
+    since = _header_date(if_range)
+    return since is not None and int(stat_result.st_mtime) == int(since)
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """المدى المطلوب (البداية، النهاية شاملة)، أو None لإرسال الملف كاملاً"""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            # bytes=-500: آخر 500 بايت
+            length = int(last)
+            start, end = max(size - length, 0), size - 1
+            if length <= 0:
+                start = size
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start < 0 or start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="المدى المطلوب غير صالح",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+async def _read_range(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as source:
+        await source.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await source.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    path: str,
+    filename: str,
+    media_type: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    disposition: str = "attachment",
+    stat_result: Optional[os.stat_result] = None,
+) -> Response:
+    """استجابة ملف مع Range و ETag و 304 (يرفع 404 إذا لم يوجد الملف)"""
+    stat_result = stat_result or stat_file(path)
+    if content_hash:
+        etag = f'"{content_hash}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'W/"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+        cache_control = REVALIDATE_CACHE_CONTROL
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+    }
+
+    if is_not_modified(request, etag, stat_result):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header and _if_range_matches(request, etag, stat_result):
+        byte_range = parse_range(range_header, stat_result.st_size)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+            headers["content-length"] = str(end - start + 1)
+            headers["content-disposition"] = content_disposition(filename, disposition)
+            return StreamingResponse(
+                _read_range(path, start, end), status_code=206, media_type=media_type, headers=headers
+            )
+
+    return FileResponse(
+        path,
+        stat_result=stat_result,
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        method=request.method,
+        content_disposition_type=disposition,
+    )
+
+
+class _FileAwareGZipResponder(GZipResponder):
+    async def send_with_gzip(self, message: Message):
+        await super().send_with_gzip(message)
+        # استجابات الملفات تُرسل كما هي: الضغط يكسر Content-Range ويغير معنى الـ ETag القوي
+        if message["type"] == "http.response.start" and "accept-ranges" in Headers(raw=message["headers"]):
+            self.content_encoding_set = True
+
+
+class FileAwareGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware لا يضغط استجابات الملفات (التي تحمل Accept-Ranges)"""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _FileAwareGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,218 @@
+"""
+إعداد نظام السجلات
+- السجلات تُوضع في طابور (QueueHandler) وتُكتب من thread منفصل (QueueListener)
+  فلا يتوقف الـ event loop على الكتابة في الملف
+- الكتابة على دفعات بصيغة JSON lines مع تدوير الملف حسب الحجم
+- أخذ عينات من سجلات الطلبات الناجحة لتقليل حجم السجل تحت الضغط
+"""
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+
+from app.core.config import settings
+
+# الخصائص الافتراضية لأي LogRecord، أي خاصية غيرها تأتي من extra وتُضاف للـ JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+ACCESS_LOGGER = "app.access"
+
+
+class JsonFormatter(logging.Formatter):
+    """تنسيق السجل كسطر JSON واحد مع الحقول الإضافية (extra)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "timestamp": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """الاحتفاظ بنسبة من سجلات الطلبات الناجحة والسريعة فقط، والأخطاء والطلبات البطيئة دائماً"""
+
+    def __init__(self, rate: float = 1.0, slow_ms: float = 1000):
+        super().__init__()
+        self.rate = rate
+        self.slow_ms = slow_ms
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1:
+            return True
+        status = getattr(record, "status", 0)
+        latency = getattr(record, "latency_ms", 0)
+        if status >= 400 or latency >= self.slow_ms:
+            return True
+        return random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """وضع السجل في الطابور دون انتظار، وإسقاطه إذا امتلأ الطابور بدلاً من إيقاف الطلب"""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # الرسالة تُجهز هنا ويبقى التنسيق (JSON أو نص) للـ handlers في الـ listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """كتابة مجموعة سجلات بعملية write و flush واحدة مع التدوير حسب الحجم"""
+
+    def emit_batch(self, records: List[logging.LogRecord]):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+
+        self.acquire()
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            pending = []
+            size = self.stream.tell()
+            for line in lines:
+                length = len(line.encode(self.encoding or "utf-8"))
+                if self.maxBytes > 0 and pending and size + length >= self.maxBytes:
+                    self.stream.write("".join(pending))
+                    self.doRollover()
+                    pending, size = [], 0
+                pending.append(line)
+                size += length
+            self.stream.write("".join(pending))
+            self.stream.flush()
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+
+class BatchingQueueListener(QueueListener):
+    """سحب كل السجلات المتوفرة في الطابور (حتى batch_size) وتمريرها للـ handlers دفعة واحدة"""
+
+    def __init__(self, log_queue, *handlers, batch_size: int = 256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def handle_batch(self, records: List[logging.LogRecord]):
+        for handler in self.handlers:
+            accepted = [record for record in records if record.levelno >= handler.level]
+            if not accepted:
+                continue
+            if hasattr(handler, "emit_batch"):
+                handler.emit_batch(accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+    def _monitor(self):
+        log_queue = self.queue
+        has_task_done = hasattr(log_queue, "task_done")
+        stop = False
+        while not stop:
+            record = self.dequeue(True)
+            if record is self._sentinel:
+                stop = True
+                batch = []
+            else:
+                batch = [record]
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    batch.append(record)
+
+            if batch:
+                self.handle_batch(batch)
+            if has_task_done:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    log_queue.task_done()
+
+
+_listener: Optional[BatchingQueueListener] = None
+
+
+def setup_logging():
+    """تهيئة السجلات مرة واحدة عند بدء التطبيق"""
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = BatchingRotatingFileHandler(
+        settings.LOG_FILE,
+        maxBytes=settings.LOG_MAX_BYTES,
+        backupCount=settings.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    if settings.LOG_FORMAT == "json":
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _listener = BatchingQueueListener(
+        log_queue, file_handler, console_handler, batch_size=settings.LOG_BATCH_SIZE
+    )
+
+    root = logging.getLogger()
+    root.handlers = [NonBlockingQueueHandler(log_queue)]
+    root.setLevel(settings.LOG_LEVEL)
+
+    # الفلتر على الـ logger نفسه حتى لا تدخل السجلات المستبعدة إلى الطابور أصلاً
+    logging.getLogger(ACCESS_LOGGER).addFilter(
+        SamplingFilter(settings.ACCESS_LOG_SAMPLE_RATE, settings.ACCESS_LOG_SLOW_MS)
+    )
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """كتابة السجلات المتبقية في الطابور وإيقاف الـ listener"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,393 @@
+"""
+مقاييس التطبيق بصيغة Prometheus النصية (/metrics)
+- العدادات والـ histograms مقسمة لكل thread (threading.local): كل thread يكتب في
+  قاموسه الخاص دون أقفال، وتُجمع القيم عند القراءة فقط
+- المقاييس المحسوبة (حجم الـ cache، اتصالات WebSocket، مجمع الاتصالات...) تُقرأ
+  من مصدرها عند الطلب عبر دوال callback فلا تكلف شيئاً بين القراءات
+
+المقاييس خاصة بكل عملية (process) مثل prometheus_client بدون multiprocess mode.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Starlette يضيف charset=utf-8 للأنواع النصية
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+_INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Shards:
+    """قاموس لكل thread، والقراءة تجمع جميع القواميس"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._all: List[dict] = []
+
+    def mine(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            # append ذري في CPython
+            self._all.append(shard)
+        return shard
+
+    def shards(self) -> List[dict]:
+        return list(self._all)
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = _Shards()
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shards.mine()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._shards.shards():
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """قيمة ترتفع وتنخفض (inc/dec من أي thread) أو تُحدد مباشرة (set)"""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        # الإسناد لعنصر في قاموس ذري في CPython
+        self._assigned: Dict[LabelValues, float] = {}
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        self._assigned[labels] = value
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals = super().values()
+        for labels, value in list(self._assigned.items()):
+            totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _Shards()
+
+    def observe(self, value: float, *labels):
+        shard = self._shards.mine()
+        series = shard.get(labels)
+        if series is None:
+            # عدد كل bucket، ثم المجموع، ثم العدد الكلي
+            series = shard[labels] = [0] * (len(self.buckets) + 2)
+        position = bisect_left(self.buckets, value)
+        if position < len(self.buckets):
+            series[position] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self) -> Iterable[str]:
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in self._shards.shards():
+            for labels, series in list(shard.items()):
+                total = totals.setdefault(labels, [0] * len(series))
+                for i, value in enumerate(list(series)):
+                    total[i] += value
+
+        for labels, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, _INF_LABEL)} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}"
+
+
+class CallbackMetric(Metric):
+    """قيمة تُقرأ من مصدرها عند كل طلب لـ /metrics
+
+    الدالة تعيد رقماً، أو قائمة (قيم الـ labels، الرقم)، أو None لتجاهل المقياس.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable,
+        labelnames: Sequence[str] = (),
+        type: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type = type
+
+    def samples(self) -> Iterable[str]:
+        try:
+            result = self.callback()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} callback error: {e}")
+            return
+        if result is None:
+            return
+        if not isinstance(result, (list, tuple)):
+            result = [((), result)]
+        for labels, value in result:
+            if value is not None:
+                yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self, name: str, documentation: str, callback: Callable, labelnames: Sequence[str] = (), type: str = "gauge"
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, callback, labelnames, type))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            samples = list(metric.samples())
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being served")
+rate_limit_rejections = registry.counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter", ("rule",)
+)
+ip_filter_rejections = registry.counter("ip_filter_rejections_total", "Requests rejected by the IP filter")
+
+# ---------------------------------------------------------------------------
+# المهام الخلفية
+# ---------------------------------------------------------------------------
+
+background_task_duration = registry.histogram(
+    "background_task_duration_seconds",
+    "Duration of one background task loop iteration",
+    ("task",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+background_task_errors = registry.counter(
+    "background_task_errors_total", "Background task loop iterations that raised", ("task",)
+)
+background_task_last_run = registry.gauge(
+    "background_task_last_run_timestamp_seconds", "Unix time of the last background task run", ("task",)
+)
+
+
+@contextmanager
+def track_task(task: str):
+    """قياس دورة واحدة من مهمة خلفية"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        background_task_errors.inc(task)
+        raise
+    finally:
+        background_task_duration.observe(time.perf_counter() - started, task)
+        background_task_last_run.set(time.time(), task)
+
+
+# ---------------------------------------------------------------------------
+# مجمع اتصالات قاعدة البيانات
+# ---------------------------------------------------------------------------
+
+db_pool_checkouts = registry.counter("db_pool_checkouts_total", "Connections checked out of the pool")
+db_pool_checkout_duration = registry.histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+db_pool_checkout_timeouts = registry.counter("db_pool_checkout_timeouts_total", "Pool checkouts that timed out")
+
+
+def instrument_pool(engine):
+    """قياس زمن انتظار الاتصال من الـ pool وحالته"""
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+    pool = engine.pool
+    if getattr(pool, "_metrics_instrumented", False):
+        return
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            connection = connect()
+        except PoolTimeoutError:
+            db_pool_checkout_timeouts.inc()
+            raise
+        db_pool_checkout_duration.observe(time.perf_counter() - started)
+        db_pool_checkouts.inc()
+        return connection
+
+    pool.connect = timed_connect
+    pool._metrics_instrumented = True
+
+    def pool_value(method: str):
+        function = getattr(pool, method, None)
+        return (lambda: function()) if callable(function) else (lambda: None)
+
+    registry.callback("db_pool_size", "Configured pool size", pool_value("size"))
+    registry.callback("db_pool_checked_out", "Connections currently checked out", pool_value("checkedout"))
+    registry.callback("db_pool_checked_in", "Idle connections in the pool", pool_value("checkedin"))
+    registry.callback("db_pool_overflow", "Connections opened above the pool size", pool_value("overflow"))
+
+
+# ---------------------------------------------------------------------------
+# مقاييس مكونات التطبيق (cache، WebSocket، النظام)
+# ---------------------------------------------------------------------------
+
+def _snapshot(function: Callable, ttl: float = 1.0) -> Callable:
+    """نتيجة function محفوظة لثانية حتى تشترك فيها مقاييس نفس القراءة"""
+    state = {"at": 0.0, "value": None}
+
+    def read():
+        now = time.monotonic()
+        if now - state["at"] > ttl:
+            state["value"] = function()
+            state["at"] = now
+        return state["value"]
+
+    return read
+
+
+def register_app_metrics(engine, cache, notification_hub):
+    """تسجيل المقاييس المقروءة من مكونات التطبيق عند كل طلب لـ /metrics"""
+    instrument_pool(engine)
+
+    cache_stats = _snapshot(cache.stats)
+    for key, name, kind, documentation in (
+        ("hits", "cache_hits_total", "counter", "Cache lookups that found a value"),
+        ("misses", "cache_misses_total", "counter", "Cache lookups that found nothing"),
+        ("evictions", "cache_evictions_total", "counter", "Entries evicted to respect cache limits"),
+        ("entries", "cache_entries", "gauge", "Entries currently cached"),
+        ("bytes", "cache_bytes", "gauge", "Estimated cache size in bytes"),
+        ("hit_ratio", "cache_hit_ratio", "gauge", "Cache hits / lookups since start"),
+    ):
+        registry.callback(name, documentation, lambda key=key: cache_stats().get(key), type=kind)
+
+    hub_stats = _snapshot(notification_hub.stats)
+    registry.callback("websocket_connections", "Open WebSocket connections", lambda: hub_stats()["connections"])
+    registry.callback("websocket_channels", "Subscribed notification channels", lambda: hub_stats()["channels"])
+    registry.callback(
+        "websocket_dropped_messages_total",
+        "Messages dropped for slow WebSocket consumers",
+        lambda: hub_stats()["dropped"],
+        type="counter",
+    )
+
+    try:
+        import psutil
+    except ImportError:
+        return
+    process = psutil.Process()
+    registry.callback("process_resident_memory_bytes", "Resident memory size", lambda: process.memory_info().rss)
+    registry.callback("system_memory_usage_percent", "System memory usage", lambda: psutil.virtual_memory().percent)
+    registry.callback("disk_usage_percent", "Disk usage of the root filesystem", lambda: psutil.disk_usage("/").percent)
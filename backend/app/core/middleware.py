@@ -7,72 +7,66 @@ import time
 import traceback
 from datetime import datetime
 
-# إعداد logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
+from app.core.logging_config import ACCESS_LOGGER
 
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+def error_response(status_code: int, message) -> JSONResponse:
+    """استجابة خطأ بالصيغة الموحدة للنظام"""
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "error": True,
+            "message": message,
+            "status_code": status_code,
+            "timestamp": datetime.now().isoformat()
+        }
+    )
 
 class ErrorHandlingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
         try:
             response = await call_next(request)
             
-            # تسجيل الطلب
-            process_time = time.time() - start_time
-            logger.info(
-                f"{request.method} {request.url.path} - "
-                f"Status: {response.status_code} - "
-                f"Time: {process_time:.4f}s"
-            )
-            
             return response
             
         except HTTPException as e:
             logger.warning(f"HTTP Exception: {e.status_code} - {e.detail}")
-            return JSONResponse(
-                status_code=e.status_code,
-                content={
-                    "error": True,
-                    "message": e.detail,
-                    "status_code": e.status_code,
-                    "timestamp": datetime.now().isoformat()
-                }
-            )
+            return error_response(e.status_code, e.detail)
             
         except Exception as e:
             logger.error(f"Unhandled exception: {str(e)}")
             logger.error(traceback.format_exc())
             
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": True,
-                    "message": "حدث خطأ داخلي في الخادم",
-                    "status_code": 500,
-                    "timestamp": datetime.now().isoformat()
-                }
-            )
+            return error_response(500, "حدث خطأ داخلي في الخادم")
+
+def log_access(method: str, path: str, status: int, latency: float, client_ip: str, user_id=None):
+    """سجل واحد لكل طلب يحتوي كل بياناته"""
+    latency_ms = round(latency * 1000, 2)
+    access_logger.info(
+        f"{method} {path} {status} {latency_ms}ms",
+        extra={
+            "method": method,
+            "path": path,
+            "status": status,
+            "latency_ms": latency_ms,
+            "user_id": user_id,
+            "client_ip": client_ip,
+        },
+    )
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
-        # تسجيل تفاصيل الطلب
+        start_time = time.perf_counter()
         client_ip = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get("user-agent", "unknown")
-        
-        logger.info(
-            f"Request: {request.method} {request.url.path} - "
-            f"IP: {client_ip} - "
-            f"User-Agent: {user_agent}"
-        )
-        
-        response = await call_next(request)
-        return response
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            log_access(
+                request.method, request.url.path, status, time.perf_counter() - start_time,
+                client_ip, getattr(request.state, "user_id", None),
+            )
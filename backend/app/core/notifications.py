@@ -0,0 +1,288 @@
+"""
+مركز الإشعارات الفورية عبر WebSocket
+- لكل اتصال طابور إرسال محدود ومهمة إرسال خاصة، فالعميل البطيء لا يؤخر غيره
+- العميل الذي يمتلئ طابوره يُسقط أقدم رسائله أو يُفصل حسب الإعدادات
+- التوجيه حسب القنوات: user:{id} و company:{id} و broadcast
+- الأحداث تمر عبر broker (محلي أو Redis pub/sub) لتصل إلى الاتصالات في جميع العمليات
+"""
+
+from typing import Dict, Iterable, Optional, Set
+import asyncio
+import json
+import logging
+
+from fastapi import WebSocket
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_CHANNEL = "broadcast"
+
+# سياسات التعامل مع العميل البطيء
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+
+def user_channel(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def company_channel(company_id) -> str:
+    return f"company:{company_id}"
+
+
+class Connection:
+    """اتصال WebSocket واحد مع طابور الإرسال الخاص به"""
+
+    def __init__(self, websocket: WebSocket, channels: Iterable[str], queue_size: int):
+        self.websocket = websocket
+        self.channels: Set[str] = set(channels)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.sender: Optional[asyncio.Task] = None
+
+
+class LocalBroker:
+    """توصيل الأحداث داخل العملية الحالية فقط"""
+
+    name = "memory"
+
+    def __init__(self, hub: "NotificationHub"):
+        self.hub = hub
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, message: str):
+        self.hub.deliver(channel, message)
+
+
+class RedisBroker:
+    """توزيع الأحداث على جميع العمليات عبر Redis pub/sub
+
+    كل عملية تستقبل ما يُنشر (بما فيها العملية الناشرة) وتسلمه لاتصالاتها المحلية.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, hub: "NotificationHub", prefix: str = "workers:notify:"):
+        import redis
+        import redis.asyncio as aioredis
+
+        # التأكد من إمكانية الاتصال قبل اعتماد هذا الـ broker
+        redis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=1).ping()
+        self.hub = hub
+        self.prefix = prefix
+        self.client = aioredis.Redis.from_url(url, socket_connect_timeout=1)
+        self._error_class = redis.RedisError
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await self.client.close()
+
+    async def publish(self, channel: str, message: str):
+        try:
+            await self.client.publish(self.prefix + channel, message)
+        except self._error_class as e:
+            # عند تعذر الوصول إلى Redis تصل الرسالة على الأقل لاتصالات هذه العملية
+            logger.warning(f"Redis publish error, delivering locally: {e}")
+            self.hub.deliver(channel, message)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(self.prefix + "*")
+                while True:
+                    item = await pubsub.get_message(timeout=1.0)
+                    if item is None:
+                        continue
+                    channel = item["channel"].decode()[len(self.prefix):]
+                    self.hub.deliver(channel, item["data"].decode())
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                logger.error(f"Redis subscription error: {e}")
+                await pubsub.close()
+                await asyncio.sleep(1)
+
+
+class NotificationHub:
+    def __init__(
+        self,
+        queue_size: int = 100,
+        policy: str = DROP_OLDEST,
+        heartbeat_seconds: float = 30,
+        send_timeout: float = 10,
+    ):
+        self.queue_size = queue_size
+        self.policy = policy
+        self.heartbeat_seconds = heartbeat_seconds
+        self.send_timeout = send_timeout
+        self.channels: Dict[str, Set[Connection]] = {}
+        self.connections: Set[Connection] = set()
+        self.broker = LocalBroker(self)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    async def start(self):
+        """تشغيل الـ broker ونبضات الاتصال (عند بدء التطبيق)"""
+        self.loop = asyncio.get_running_loop()
+        await self.broker.start()
+        if self._heartbeat is None and self.heartbeat_seconds > 0:
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for connection in list(self.connections):
+            await self.disconnect(connection)
+        await self.broker.stop()
+        self.loop = None
+
+    async def connect(self, websocket: WebSocket, user_id=None, company_id=None) -> Connection:
+        await websocket.accept()
+        channels = [BROADCAST_CHANNEL]
+        if user_id is not None:
+            channels.append(user_channel(user_id))
+        if company_id is not None:
+            channels.append(company_channel(company_id))
+
+        connection = Connection(websocket, channels, self.queue_size)
+        self.connections.add(connection)
+        for channel in connection.channels:
+            self.channels.setdefault(channel, set()).add(connection)
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        return connection
+
+    async def disconnect(self, connection: Connection):
+        if connection not in self.connections:
+            return
+        self.connections.discard(connection)
+        for channel in connection.channels:
+            members = self.channels.get(channel)
+            if members is not None:
+                members.discard(connection)
+                if not members:
+                    del self.channels[channel]
+
+        sender = connection.sender
+        if sender is not None and sender is not asyncio.current_task():
+            sender.cancel()
+        try:
+            await connection.websocket.close()
+        except Exception:
+            pass
+
+    async def publish(self, channel: str, event: dict):
+        """نشر حدث على قناة (يصل لجميع العمليات عبر الـ broker)"""
+        await self.broker.publish(channel, json.dumps(event, ensure_ascii=False, default=str))
+
+    async def broadcast(self, event: dict):
+        await self.publish(BROADCAST_CHANNEL, event)
+
+    def publish_nowait(self, channels: Iterable[str], event: dict):
+        """نشر حدث دون انتظار، من كود async أو من routes المتزامنة التي تعمل في thread pool"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        for channel in channels:
+            if running is loop:
+                task = loop.create_task(self.publish(channel, event))
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+            else:
+                asyncio.run_coroutine_threadsafe(self.publish(channel, event), loop)
+
+    def deliver(self, channel: str, message: str):
+        """وضع الرسالة في طوابير اتصالات هذه العملية دون انتظار أي إرسال"""
+        for connection in tuple(self.channels.get(channel, ())):
+            self._offer(connection, message)
+
+    def _offer(self, connection: Connection, message: str):
+        try:
+            connection.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        connection.dropped += 1
+        if self.policy == DISCONNECT:
+            logger.warning(f"Disconnecting slow WebSocket consumer ({connection.dropped} dropped)")
+            # الاحتفاظ بمرجع للمهمة حتى لا يتم جمعها قبل تنفيذها
+            task = asyncio.create_task(self.disconnect(connection))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+            return
+
+        # DROP_OLDEST: الرسائل الأحدث أهم من القديمة
+        connection.queue.get_nowait()
+        connection.queue.put_nowait(message)
+
+    async def _send_loop(self, connection: Connection):
+        try:
+            while True:
+                message = await connection.queue.get()
+                await asyncio.wait_for(connection.websocket.send_text(message), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # اتصال مغلق أو عميل لا يستقبل خلال المهلة
+            logger.info(f"WebSocket send failed, disconnecting: {e}")
+            await self.disconnect(connection)
+
+    async def _heartbeat_loop(self):
+        ping = json.dumps({"type": "ping"})
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for connection in tuple(self.connections):
+                self._offer(connection, ping)
+
+    def stats(self) -> Dict:
+        return {
+            "broker": self.broker.name,
+            "connections": len(self.connections),
+            "channels": len(self.channels),
+            "dropped": sum(connection.dropped for connection in self.connections),
+        }
+
+
+def create_notification_hub() -> NotificationHub:
+    """إنشاء مركز الإشعارات واختيار الـ broker حسب الإعدادات (Redis إذا كان متاحاً)"""
+    hub = NotificationHub(
+        queue_size=settings.NOTIFY_QUEUE_SIZE,
+        policy=settings.NOTIFY_SLOW_CONSUMER_POLICY,
+        heartbeat_seconds=settings.NOTIFY_HEARTBEAT_SECONDS,
+        send_timeout=settings.NOTIFY_SEND_TIMEOUT,
+    )
+
+    backend = settings.NOTIFY_BACKEND.lower()
+    if backend in ("auto", "redis") and settings.REDIS_URL:
+        try:
+            hub.broker = RedisBroker(settings.REDIS_URL, hub)
+        except Exception as e:
+            logger.warning(f"Redis notifications broker unavailable, using local delivery: {e}")
+
+    return hub
+
+
+notification_hub = create_notification_hub()
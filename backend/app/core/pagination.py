@@ -0,0 +1,125 @@
+"""
+التصفح بالمؤشر (keyset pagination)
+بدلاً من OFFSET الذي يقرأ ويتجاوز كل الصفوف السابقة، تبدأ الصفحة التالية مباشرة
+بعد آخر معرف في الصفحة الحالية (WHERE id > :last_id ORDER BY id) باستخدام الفهرس
+
+المؤشر نص مبهم (base64) يُرسل في header باسم X-Next-Cursor، ويُمرر كما هو في
+معامل cursor لجلب الصفحة التالية. وضع skip/page القديم ما زال مدعوماً.
+"""
+
+from typing import List, Optional, Tuple
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: dict) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+    return values
+
+
+def paginate(
+    query,
+    key_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    response: Optional[Response] = None,
+) -> List:
+    """جلب صفحة مرتبة حسب key_column (عمود فريد مفهرس مثل id)
+
+    مع cursor تبدأ الصفحة بعد آخر قيمة في الصفحة السابقة، وبدونه يُستخدم offset.
+    في الحالتين يُضاف X-Next-Cursor للاستجابة إذا وجدت صفحة تالية، فيمكن للعميل
+    الانتقال لوضع المؤشر من أي صفحة.
+    """
+    query = _page_query(query, key_column, limit, cursor, offset)
+    rows = query.all()
+    return _finish_page(rows, key_column.key, limit, response)
+
+
+async def paginate_async(
+    db,
+    statement,
+    key_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    response: Optional[Response] = None,
+) -> List:
+    """نفس paginate لاستعلام select() على AsyncSession"""
+    statement = _page_query(statement, key_column, limit, cursor, offset)
+    rows = (await db.scalars(statement)).all()
+    return _finish_page(rows, key_column.key, limit, response)
+
+
+def _matches_column_type(value, key_column) -> bool:
+    """قيمة المؤشر من نفس نوع العمود، حتى لا يصل {"id": "x"} إلى قاعدة البيانات"""
+    try:
+        python_type = key_column.type.python_type
+    except NotImplementedError:
+        return True
+    # bool فرع من int في Python، و JSON لا يحول الأرقام إلى bool
+    return isinstance(value, python_type) and not (isinstance(value, bool) and python_type is not bool)
+
+
+def _page_query(query, key_column, limit: int, cursor: Optional[str], offset: int):
+    """الترتيب وبداية الصفحة، يعمل مع Query و select()"""
+    key = key_column.key
+    query = query.order_by(key_column)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if key not in values or not _matches_column_type(values[key], key_column):
+            raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+        query = query.filter(key_column > values[key])
+    elif offset > 0:
+        query = query.offset(offset)
+
+    # صف إضافي لمعرفة وجود صفحة تالية دون استعلام COUNT
+    return query.limit(limit + 1)
+
+
+def paginate_counted(
+    query,
+    key_column,
+    limit: int,
+    offset: int = 0,
+    response: Optional[Response] = None,
+) -> Tuple[List, Optional[int]]:
+    """صفحة بالـ offset مع العدد الكلي للنتائج في نفس الاستعلام (COUNT(*) OVER())
+
+    يغني عن استعلام COUNT ثانٍ يعيد فحص نفس الشروط. يعيد total = None إذا كانت
+    الصفحة بعد نهاية النتائج (لا توجد صفوف يُقرأ منها العدد).
+    """
+    query = query.add_columns(func.count().over()).order_by(key_column)
+    if offset > 0:
+        query = query.offset(offset)
+    rows = query.limit(limit + 1).all()
+
+    total = rows[0][1] if rows else (0 if offset <= 0 else None)
+    items = _finish_page([row[0] for row in rows], key_column.key, limit, response)
+    return items, total
+
+
+def _finish_page(rows: List, key: str, limit: int, response: Optional[Response]) -> List:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if response is not None:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor({key: getattr(rows[-1], key)})
+    return rows
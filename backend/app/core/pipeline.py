@@ -0,0 +1,209 @@
+"""
+Middleware موحد بنمط ASGI الخالص
+يجمع معالجة الأخطاء وتسجيل الطلبات وتصفية IP والـ rate limiting وheaders الأمان
+في طبقة واحدة بدلاً من خمس طبقات BaseHTTPMiddleware، ولا يغلف الـ response
+لذلك تعمل الـ streaming responses بشكل طبيعي
+
+max_upload_size يوقف قراءة طلبات multipart/form-data بمجرد تجاوز الحد (413)، قبل أن
+يكتب Starlette الملف كاملاً إلى الملف المؤقت
+"""
+
+from typing import Dict, List, Optional, Tuple
+import logging
+import time
+import traceback
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.middleware import error_response, log_access
+from app.core.query_counter import (
+    QUERY_COUNT_HEADER,
+    SERVER_TIMING_HEADER,
+    QueryCounter,
+    check_threshold,
+    count_queries,
+)
+from app.core.security_middleware import (
+    SECURITY_HEADERS,
+    RouteLimits,
+    ip_block_reason,
+    rate_limit_identity,
+    rate_limit_response,
+    rate_limiter,
+)
+
+logger = logging.getLogger("app.core.middleware")
+
+# هامش لحقول النموذج الأخرى وحدود الأجزاء فوق حجم الملف نفسه
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _is_multipart(scope: Scope) -> bool:
+    return (_header(scope, b"content-type") or "").startswith("multipart/form-data")
+
+
+def _limit_body(receive: Receive, max_size: int) -> Receive:
+    """رفع 413 عند تجاوز حجم الجسم (الطلبات بدون Content-Length أو بقيمة غير صحيحة)"""
+    received = 0
+
+    async def limited_receive() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_size:
+                raise HTTPException(status_code=413, detail="حجم الملف يتجاوز الحد المسموح")
+        return message
+
+    return limited_receive
+
+
+class RequestPipelineMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        error_handling: bool = True,
+        access_log: bool = True,
+        ip_filter: bool = True,
+        rate_limit: bool = True,
+        security_headers: bool = True,
+        calls: int = 100,
+        period: int = 60,
+        route_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        limiter=None,
+        query_count: bool = False,
+        query_warn_threshold: int = 0,
+        query_fail_threshold: int = 0,
+        server_timing: bool = False,
+        collect_metrics: bool = True,
+        max_upload_size: int = 0,
+    ):
+        self.app = app
+        self.error_handling = error_handling
+        self.access_log = access_log
+        self.ip_filter = ip_filter
+        self.rate_limit = rate_limit
+        self.limiter = limiter or rate_limiter
+        self.limits = RouteLimits(calls, period, route_limits)
+        self.query_count = query_count
+        self.query_warn_threshold = query_warn_threshold
+        self.query_fail_threshold = query_fail_threshold
+        self.server_timing = server_timing
+        self.collect_metrics = collect_metrics
+        self.max_body_size = max_upload_size + MULTIPART_OVERHEAD if max_upload_size else 0
+        self.security_headers: List[Tuple[bytes, bytes]] = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in SECURITY_HEADERS.items()
+        ] if security_headers else []
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if not (self.query_count or self.server_timing):
+            await self._handle(scope, receive, send)
+            return
+
+        # عد وقياس استعلامات SQL للطلب (وضع التطوير والاختبار)
+        with count_queries(f"{scope['method']} {scope['path']}", self.query_fail_threshold) as counter:
+            await self._handle(scope, receive, send, counter)
+        check_threshold(counter, self.query_warn_threshold)
+
+    async def _handle(self, scope: Scope, receive: Receive, send: Send, counter: Optional[QueryCounter] = None):
+        start_time = time.perf_counter()
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        extra_headers = list(self.security_headers)
+        # get_current_user يضع user_id في request.state، وهو نفس القاموس scope["state"]
+        request_state = scope.setdefault("state", {})
+        state = {"status": 500, "started": False}
+        if self.collect_metrics:
+            metrics.http_requests_in_flight.inc()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                state["started"] = True
+                headers = list(extra_headers)
+                if counter is not None and self.query_count:
+                    headers.append((QUERY_COUNT_HEADER.lower().encode(), str(counter.count).encode()))
+                if counter is not None and self.server_timing:
+                    timing = counter.server_timing(time.perf_counter() - start_time)
+                    headers.append((SERVER_TIMING_HEADER.lower().encode(), timing.encode("latin-1", "replace")))
+                if headers:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        try:
+            response = None
+
+            if self.ip_filter:
+                reason = ip_block_reason(client_ip)
+                if reason:
+                    response = error_response(403, reason)
+                    if self.collect_metrics:
+                        metrics.ip_filter_rejections.inc()
+
+            if response is None and self.rate_limit:
+                rule, calls, period = self.limits.for_path(scope["path"])
+                identity = rate_limit_identity(_header(scope, b"authorization"), client_ip)
+                result = await self.limiter.hit(f"{identity}:{rule}", calls, period)
+                if result.allowed:
+                    extra_headers.append((b"x-ratelimit-limit", str(result.limit).encode()))
+                    extra_headers.append((b"x-ratelimit-remaining", str(result.remaining).encode()))
+                else:
+                    response = rate_limit_response(result, period)
+                    if self.collect_metrics:
+                        metrics.rate_limit_rejections.inc(rule)
+
+            if response is None and self.max_body_size and _is_multipart(scope):
+                length = _header(scope, b"content-length")
+                if length and length.isdigit() and int(length) > self.max_body_size:
+                    response = error_response(413, "حجم الملف يتجاوز الحد المسموح")
+                else:
+                    receive = _limit_body(receive, self.max_body_size)
+
+            if response is not None:
+                await response(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+
+        except Exception as e:
+            # لا يمكن إرسال استجابة خطأ إذا بدأ إرسال الاستجابة الأصلية
+            if not self.error_handling or state["started"]:
+                raise
+
+            if isinstance(e, HTTPException):
+                logger.warning(f"HTTP Exception: {e.status_code} - {e.detail}")
+                response = error_response(e.status_code, e.detail)
+            else:
+                logger.error(f"Unhandled exception: {str(e)}")
+                logger.error(traceback.format_exc())
+                response = error_response(500, "حدث خطأ داخلي في الخادم")
+            await response(scope, receive, send_wrapper)
+
+        finally:
+            latency = time.perf_counter() - start_time
+            if self.access_log:
+                log_access(
+                    scope["method"], scope["path"], state["status"],
+                    latency, client_ip, request_state.get("user_id"),
+                )
+            if self.collect_metrics:
+                # قالب المسار (/api/employees/{employee_id}) وليس المسار الفعلي حتى لا تتضخم السلاسل
+                route = scope.get("route")
+                template = getattr(route, "path", None) or "<unmatched>"
+                metrics.http_requests_in_flight.dec()
+                metrics.http_requests.inc(scope["method"], template, str(state["status"]))
+                metrics.http_request_duration.observe(latency, scope["method"], template)
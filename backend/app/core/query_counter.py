@@ -0,0 +1,199 @@
+"""
+عداد ومحلل استعلامات SQL لكل طلب (للتطوير والاختبار)
+يكشف مشكلة N+1 (قائمة تُحمل علاقة كل صف باستعلام منفصل) ويوضح أين يذهب وقت الطلب
+
+- SQL_QUERY_COUNT_ENABLED: تفعيل العد وإضافة header باسم X-SQL-Queries للاستجابة
+- SQL_QUERY_WARN_THRESHOLD: تسجيل تحذير مع الاستعلامات إذا تجاوزها الطلب
+- SQL_QUERY_FAIL_THRESHOLD: رفع TooManyQueriesError عند تجاوزها (0 = معطل)،
+  مفيد في الاختبارات حتى يفشل الطلب بدلاً من التحذير فقط
+- SQL_PROFILING_ENABLED: قياس زمن كل استعلام، وإضافة header باسم Server-Timing
+  (عدد الاستعلامات، زمن قاعدة البيانات، أبطأ الاستعلامات)، وجدول أبطأ الاستعلامات
+  المعروض في /api/debug/slow-queries
+
+أحداث المحرك لا تُسجل إلا عند تفعيل أحد الخيارين (instrument_engine)، لذلك لا
+توجد أي تكلفة على الاستعلامات عند التعطيل.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import heapq
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-SQL-Queries"
+SERVER_TIMING_HEADER = "Server-Timing"
+
+# عدد الاستعلامات المحفوظة نصوصها لرسالة التحذير
+MAX_RECORDED_STATEMENTS = 50
+
+# أبطأ الاستعلامات لكل طلب في Server-Timing
+SLOWEST_PER_REQUEST = 3
+
+_START_KEY = "query_start_times"
+
+
+class TooManyQueriesError(Exception):
+    pass
+
+
+def _normalize(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+class QueryCounter:
+    def __init__(self, label: str = "", fail_threshold: int = 0):
+        self.label = label
+        self.fail_threshold = fail_threshold
+        self.count = 0
+        self.db_time = 0.0
+        self.statements: List[str] = []
+        self.slowest: List[Tuple[float, str]] = []
+
+    def record(self, statement: str):
+        self.count += 1
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append(statement)
+        if self.fail_threshold and self.count > self.fail_threshold:
+            raise TooManyQueriesError(
+                f"{self.label}: {self.count} SQL statements (limit {self.fail_threshold})"
+            )
+
+    def record_time(self, statement: str, duration: float):
+        self.db_time += duration
+        if len(self.slowest) < SLOWEST_PER_REQUEST:
+            heapq.heappush(self.slowest, (duration, statement))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, statement))
+
+    def summary(self, limit: int = 10) -> str:
+        """أكثر الاستعلامات تكراراً (علامة N+1)"""
+        repeated = {}
+        for statement in self.statements:
+            key = _normalize(statement)[:200]
+            repeated[key] = repeated.get(key, 0) + 1
+        top = sorted(repeated.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return "\n".join(f"  {count}x {statement}" for statement, count in top)
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """قيمة Server-Timing: زمن قاعدة البيانات وأبطأ الاستعلامات (بالمللي ثانية)"""
+        parts = [f'db;dur={self.db_time * 1000:.2f};desc="{self.count} queries"']
+        for i, (duration, statement) in enumerate(sorted(self.slowest, reverse=True), 1):
+            description = _normalize(statement)[:80].replace('"', "'").replace("\\", "")
+            parts.append(f'sql{i};dur={duration * 1000:.2f};desc="{description}"')
+        if total is not None:
+            parts.append(f"app;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+class SlowQueryLog:
+    """جدول أبطأ الاستعلامات مجمعة حسب نص الاستعلام
+
+    يحتفظ بأكثر الاستعلامات زمناً فقط، وعند امتلائه يحذف الأقل زمناً كلياً.
+    """
+
+    def __init__(self, capacity: int = 50, threshold_ms: float = 0):
+        self.capacity = capacity
+        self.threshold = threshold_ms / 1000
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float, label: str):
+        if duration < self.threshold:
+            return
+        key = _normalize(statement)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {"statement": key, "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            stats["count"] += 1
+            stats["total_ms"] += duration * 1000
+            if duration * 1000 >= stats["max_ms"]:
+                stats["max_ms"] = duration * 1000
+                stats["slowest_request"] = label
+                stats["last_seen"] = time.time()
+            if len(self._stats) > self.capacity * 2:
+                self._prune()
+
+    def _prune(self):
+        keep = heapq.nlargest(self.capacity, self._stats.values(), key=lambda stats: stats["total_ms"])
+        self._stats = {stats["statement"]: stats for stats in keep}
+
+    def top(self, limit: Optional[int] = None, order_by: str = "total_ms") -> List[dict]:
+        with self._lock:
+            rows = [dict(stats) for stats in self._stats.values()]
+        rows.sort(key=lambda stats: stats[order_by], reverse=True)
+        for stats in rows:
+            stats["avg_ms"] = stats["total_ms"] / stats["count"]
+        return rows[:limit or self.capacity]
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+slow_query_log = SlowQueryLog()
+
+# كائن العداد يُشارك بين الـ middleware والـ threadpool الذي ينفذ الـ endpoint
+_current: ContextVar[Optional[QueryCounter]] = ContextVar("sql_query_counter", default=None)
+
+
+def current_counter() -> Optional[QueryCounter]:
+    return _current.get()
+
+
+@contextmanager
+def count_queries(label: str = "", fail_threshold: int = 0):
+    counter = QueryCounter(label, fail_threshold)
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+def check_threshold(counter: QueryCounter, warn_threshold: int):
+    if warn_threshold and counter.count > warn_threshold:
+        logger.warning(
+            f"{counter.label}: {counter.count} SQL statements (threshold {warn_threshold})\n{counter.summary()}"
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.record(statement)
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    starts = conn.info.get(_START_KEY)
+    if counter is None or not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    counter.record_time(statement, duration)
+    slow_query_log.record(statement, duration, counter.label)
+
+
+def _handle_error(exception_context):
+    # الاستعلام الفاشل لا يصل إلى after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(_START_KEY):
+        connection.info[_START_KEY].pop()
+
+
+def instrument_engine(engine, capacity: int = 50, slow_ms: float = 0):
+    """تسجيل أحداث العد والقياس على المحرك (مرة واحدة)"""
+    slow_query_log.capacity = capacity
+    slow_query_log.threshold = slow_ms / 1000
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 from typing import Any, Union
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.core.config import settings
@@ -47,7 +47,7 @@ def verify_token(token: str) -> Union[str, None]:
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """جلب المستخدم الحالي من الرمز المميز"""
     from app.crud.user import get_user_by_username
     
@@ -65,4 +65,6 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if user is None:
         raise credentials_exception
     
+    # لسجل الطلبات
+    request.state.user_id = user.id
     return user
@@ -1,47 +1,265 @@
 from fastapi import Request, HTTPException
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
-import time
-from collections import defaultdict
-from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
 import asyncio
+import logging
+import math
+import threading
+import time
+
+from app.core.config import settings
+from app.core.middleware import error_response
+
+logger = logging.getLogger(__name__)
+
+# حدود خاصة لبعض المسارات (calls, period) - تُطابق بأطول بادئة
+DEFAULT_ROUTE_LIMITS: Dict[str, Tuple[int, int]] = {
+    "/api/auth/login": (10, 60),
+    "/api/auth/register": (5, 60),
+    "/api/documents/upload": (30, 60),
+}
+
+
+class RateLimitResult:
+    """نتيجة فحص الحد لطلب واحد"""
+
+    __slots__ = ("allowed", "limit", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: int):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+def _evaluate_window(current: int, previous: int, elapsed: float, limit: int, period: int) -> RateLimitResult:
+    """حساب sliding window counter: يُقدَّر عدد الطلبات في آخر period ثانية
+    من عداد النافذة الحالية وجزء من عداد النافذة السابقة
+
+    current: عدد الطلبات المقبولة في النافذة الحالية (قبل هذا الطلب)
+    elapsed: نسبة ما مضى من النافذة الحالية بين 0 و 1
+    """
+    estimated = previous * (1 - elapsed) + current
+    if estimated + 1 <= limit:
+        remaining = max(0, int(limit - estimated - 1))
+        return RateLimitResult(True, limit, remaining, 0)
+
+    # الوقت اللازم حتى يصبح التقدير أقل من الحد
+    if current < limit and previous > 0:
+        needed = 1 - (limit - 1 - current) / previous
+        wait = (needed - elapsed) * period
+    else:
+        # يجب انتظار النافذة التالية حيث يصبح current الحالي هو previous
+        needed = 1 - (limit - 1) / current if current else 0
+        wait = (1 - elapsed) * period + max(0.0, needed) * period
+    return RateLimitResult(False, limit, 0, max(1, math.ceil(wait)))
+
+
+class MemoryRateLimiter:
+    """Rate limiter داخل العملية بذاكرة ثابتة لكل عميل
+
+    لكل مفتاح نحتفظ فقط بـ (رقم النافذة، عداد النافذة الحالية، عداد السابقة،
+    آخر استخدام)، وعدد المفاتيح محدود بـ max_keys مع إخراج الأقدم استخداماً.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        now = time.monotonic()
+        window = int(now // period)
+        elapsed = (now - window * period) / period
+
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None:
+                state = [window, 0, 0, now]
+                self._windows[key] = state
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+                state[3] = now
+                if state[0] != window:
+                    # الانتقال لنافذة جديدة: الحالية تصبح السابقة إن كانت متتالية
+                    state[2] = state[1] if state[0] == window - 1 else 0
+                    state[1] = 0
+                    state[0] = window
+
+            result = _evaluate_window(state[1], state[2], elapsed, limit, period)
+            if result.allowed:
+                state[1] += 1
+        return result
+
+    def cleanup(self, max_age: int = 3600):
+        """حذف العملاء الذين لم يرسلوا طلبات منذ فترة"""
+        now = time.monotonic()
+        with self._lock:
+            # المفاتيح مرتبة من الأقدم استخداماً، لذلك نتوقف عند أول مفتاح حديث
+            while self._windows:
+                last_seen = next(iter(self._windows.values()))[3]
+                if now - last_seen < max_age:
+                    break
+                self._windows.popitem(last=False)
+
+
+class RedisRateLimiter:
+    """Rate limiter مشترك بين جميع العمليات عبر Redis
+
+    يتم الفحص والزيادة بشكل ذري داخل سكريبت Lua ويُستخدم وقت خادم Redis
+    حتى تتفق جميع العمليات على حدود النوافذ.
+    """
+
+    name = "redis"
+
+    SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local window = math.floor(now / period)
+local elapsed = (now - window * period) / period
+local current_key = KEYS[1] .. ':' .. window
+local current = tonumber(redis.call('GET', current_key) or '0')
+local previous = tonumber(redis.call('GET', KEYS[1] .. ':' .. (window - 1)) or '0')
+if previous * (1 - elapsed) + current + 1 <= limit then
+    redis.call('INCR', current_key)
+    redis.call('EXPIRE', current_key, period * 2)
+end
+return {current, previous, tostring(elapsed)}
+"""
+
+    def __init__(self, url: str, prefix: str = "workers:ratelimit:"):
+        import redis
+        import redis.asyncio as aioredis
+
+        # التأكد من إمكانية الاتصال قبل اعتماد هذا المخزن
+        redis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=1).ping()
+        self.prefix = prefix
+        self.client = aioredis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=1)
+        self.script = self.client.register_script(self.SCRIPT)
+        self._error_class = redis.RedisError
+        self._fallback = MemoryRateLimiter(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+    async def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        try:
+            current, previous, elapsed = await self.script(keys=[self.prefix + key], args=[limit, period])
+        except self._error_class as e:
+            # عند تعطل Redis نستمر بحدود محلية بدلاً من رفض أو تمرير كل الطلبات
+            logger.warning(f"Redis rate limiter error, using local limits: {e}")
+            return await self._fallback.hit(key, limit, period)
+        return _evaluate_window(int(current), int(previous), float(elapsed), limit, period)
+
+    def cleanup(self, max_age: int = 3600):
+        # المفاتيح في Redis تنتهي تلقائياً عبر EXPIRE
+        self._fallback.cleanup(max_age)
+
+
+def create_rate_limiter():
+    """اختيار مخزن الـ rate limiting حسب الإعدادات (Redis إذا كان متاحاً)"""
+    backend = settings.RATE_LIMIT_BACKEND.lower()
+
+    if backend in ("auto", "redis") and settings.REDIS_URL:
+        try:
+            return RedisRateLimiter(settings.REDIS_URL)
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, falling back to memory: {e}")
+
+    return MemoryRateLimiter(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
 
 # Rate limiting storage
-rate_limit_storage = defaultdict(list)
+rate_limiter = create_rate_limiter()
+
+
+def rate_limit_identity(authorization: Optional[str], client_ip: str) -> str:
+    """مفتاح العميل: المستخدم إذا كان الطلب مصادقاً، وإلا عنوان IP"""
+    if authorization and authorization[:7].lower() == "bearer ":
+        from app.core.security import verify_token
+
+        username = verify_token(authorization[7:])
+        if username:
+            return f"user:{username}"
+
+    return f"ip:{client_ip}"
+
+
+class RouteLimits:
+    """الحد الافتراضي مع حدود خاصة لبعض المسارات"""
+
+    def __init__(self, calls: int = 100, period: int = 60, route_limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.calls = calls
+        self.period = period
+        routes = DEFAULT_ROUTE_LIMITS if route_limits is None else route_limits
+        # أطول بادئة أولاً حتى تتغلب الحدود الأكثر تحديداً
+        self.route_limits = sorted(routes.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def for_path(self, path: str) -> Tuple[str, int, int]:
+        """الحد المطبق على المسار: (اسم القاعدة، calls، period)"""
+        for prefix, (calls, period) in self.route_limits:
+            if path.startswith(prefix):
+                return prefix, calls, period
+        return "default", self.calls, self.period
+
+
+def rate_limit_response(result: RateLimitResult, period: int) -> JSONResponse:
+    """استجابة 429 بنفس صيغة أخطاء النظام مع Retry-After"""
+    response = error_response(
+        429,
+        f"تم تجاوز الحد المسموح من الطلبات. الحد الأقصى {result.limit} طلب كل {period} ثانية"
+    )
+    response.headers["Retry-After"] = str(result.retry_after)
+    response.headers["X-RateLimit-Limit"] = str(result.limit)
+    response.headers["X-RateLimit-Remaining"] = "0"
+    return response
+
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, calls: int = 100, period: int = 60):
+    def __init__(
+        self,
+        app,
+        calls: int = 100,
+        period: int = 60,
+        route_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        limiter=None,
+    ):
         super().__init__(app)
         self.calls = calls  # عدد الطلبات المسموحة
         self.period = period  # الفترة الزمنية بالثواني
-    
+        self.limiter = limiter or rate_limiter
+        self.limits = RouteLimits(calls, period, route_limits)
+
     async def dispatch(self, request: Request, call_next):
-        # الحصول على IP العميل
+        rule, calls, period = self.limits.for_path(request.url.path)
         client_ip = request.client.host if request.client else "unknown"
-        
-        # التحقق من Rate Limiting
-        now = datetime.now()
-        
-        # تنظيف الطلبات القديمة
-        cutoff_time = now - timedelta(seconds=self.period)
-        rate_limit_storage[client_ip] = [
-            timestamp for timestamp in rate_limit_storage[client_ip]
-            if timestamp > cutoff_time
-        ]
-        
+        key = f"{rate_limit_identity(request.headers.get('authorization'), client_ip)}:{rule}"
+
         # التحقق من تجاوز الحد
-        if len(rate_limit_storage[client_ip]) >= self.calls:
-            raise HTTPException(
-                status_code=429,
-                detail=f"تم تجاوز الحد المسموح من الطلبات. الحد الأقصى {self.calls} طلب كل {self.period} ثانية"
-            )
-        
-        # إضافة الطلب الحالي
-        rate_limit_storage[client_ip].append(now)
-        
+        result = await self.limiter.hit(key, calls, period)
+        if not result.allowed:
+            return rate_limit_response(result, period)
+
         response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(result.limit)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
         return response
 
+SECURITY_HEADERS: Dict[str, str] = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Content-Security-Policy": "default-src 'self'",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+}
+
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """إضافة headers أمان"""
     
@@ -49,12 +267,8 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
         
         # إضافة security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        for name, value in SECURITY_HEADERS.items():
+            response.headers[name] = value
         
         return response
 
@@ -62,25 +276,27 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 BLOCKED_IPS = set()
 ALLOWED_IPS = set()  # إذا كان فارغ، سيسمح لجميع IPs
 
+def ip_block_reason(client_ip: str) -> Optional[str]:
+    """سبب رفض العنوان، أو None إذا كان مسموحاً"""
+    # التحقق من IP المحظور
+    if client_ip in BLOCKED_IPS:
+        return "الوصول محظور من هذا العنوان"
+
+    # التحقق من IP المسموح (إذا كانت القائمة غير فارغة)
+    if ALLOWED_IPS and client_ip not in ALLOWED_IPS:
+        return "الوصول غير مصرح به من هذا العنوان"
+
+    return None
+
 class IPFilterMiddleware(BaseHTTPMiddleware):
     """تصفية IP addresses"""
     
     async def dispatch(self, request: Request, call_next):
         client_ip = request.client.host if request.client else "unknown"
         
-        # التحقق من IP المحظور
-        if client_ip in BLOCKED_IPS:
-            raise HTTPException(
-                status_code=403,
-                detail="الوصول محظور من هذا العنوان"
-            )
-        
-        # التحقق من IP المسموح (إذا كانت القائمة غير فارغة)
-        if ALLOWED_IPS and client_ip not in ALLOWED_IPS:
-            raise HTTPException(
-                status_code=403,
-                detail="الوصول غير مصرح به من هذا العنوان"
-            )
+        reason = ip_block_reason(client_ip)
+        if reason:
+            raise HTTPException(status_code=403, detail=reason)
         
         response = await call_next(request)
         return response
@@ -107,15 +323,4 @@ async def cleanup_rate_limit_storage():
     """تنظيف بيانات rate limiting القديمة"""
     while True:
         await asyncio.sleep(300)  # كل 5 دقائق
-        
-        cutoff_time = datetime.now() - timedelta(seconds=3600)  # ساعة واحدة
-        
-        for ip in list(rate_limit_storage.keys()):
-            rate_limit_storage[ip] = [
-                timestamp for timestamp in rate_limit_storage[ip]
-                if timestamp > cutoff_time
-            ]
-            
-            # حذف IP إذا لم يعد لديه طلبات
-            if not rate_limit_storage[ip]:
-                del rate_limit_storage[ip]
+        rate_limiter.cleanup(max_age=3600)  # ساعة واحدة
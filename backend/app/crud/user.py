@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.core.security import get_password_hash
@@ -8,8 +8,8 @@ def get_user_by_id(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 def get_user_by_username(db: Session, username: str):
-    """جلب مستخدم باسم المستخدم"""
-    return db.query(User).filter(User.username == username).first()
+    """جلب مستخدم باسم المستخدم (مع الدور المستخدم في فحص الصلاحيات)"""
+    return db.query(User).options(joinedload(User.role)).filter(User.username == username).first()
 
 def get_user_by_email(db: Session, email: str):
     """جلب مستخدم بالبريد الإلكتروني"""
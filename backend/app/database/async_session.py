@@ -0,0 +1,87 @@
+"""
+جلسات قاعدة البيانات غير المتزامنة (AsyncSession)
+الـ endpoints المتزامنة تعمل داخل threadpool الخاص بـ FastAPI (حوالي 40 خيطاً)، فيتوقف
+الخادم عن قبول طلبات جديدة عندما تنتظر كلها استعلامات بطيئة. الـ routers المفعلة في
+ASYNC_DB_ROUTERS تستخدم get_async_db بدلاً من get_db وتنتظر قاعدة البيانات داخل
+حلقة الأحداث مباشرة.
+
+نفس DATABASE_URL مع المشغل غير المتزامن المقابل (aiosqlite / asyncpg)، ونفس إعدادات
+الـ pool و pragmas الخاصة بـ SQLite. المحرك يُنشأ عند أول استخدام فقط، فلا حاجة
+للمشغلات غير المتزامنة ما دامت كل الـ routers متزامنة.
+"""
+
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.database.session import apply_sqlite_pragmas, engine_options
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def to_async_url(url: str) -> str:
+    """تحويل رابط قاعدة البيانات للمشغل غير المتزامن"""
+    parsed = make_url(url)
+    if parsed.get_driver_name() in ("aiosqlite", "asyncpg"):
+        return url
+    drivername = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if drivername is None:
+        raise ValueError(f"لا يوجد مشغل غير متزامن لقاعدة البيانات: {parsed.get_backend_name()}")
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def create_async_database_engine(url: str) -> AsyncEngine:
+    """إنشاء محرك غير متزامن بنفس إعدادات المحرك المتزامن"""
+    async_url = to_async_url(url)
+    options = engine_options(url)
+    if "pool_size" in options and make_url(url).get_backend_name() == "sqlite":
+        # aiosqlite يستخدم NullPool افتراضياً (اتصال وخيط جديد لكل جلسة)
+        options["poolclass"] = AsyncAdaptedQueuePool
+    engine = create_async_engine(async_url, **options)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+    if settings.SQL_QUERY_COUNT_ENABLED or settings.SQL_PROFILING_ENABLED:
+        from app.core.query_counter import instrument_engine
+        instrument_engine(engine.sync_engine, settings.SQL_SLOW_QUERY_TOP_N, settings.SQL_SLOW_QUERY_MS)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_database_engine(settings.DATABASE_URL)
+        # expire_on_commit=False: الكائنات تبقى مقروءة بعد commit دون استعلام ضمني
+        # (التحميل الضمني غير ممكن خارج await)
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def dispose_async_engine():
+    """إغلاق اتصالات المحرك غير المتزامن عند إيقاف التطبيق"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_session_factory = None
+
+
+# دالة للحصول على جلسة قاعدة البيانات غير المتزامنة
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
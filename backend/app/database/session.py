@@ -1,23 +1,131 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 from app.core.config import settings
+import hashlib
+import itertools
+
+
+def engine_options(url: str) -> dict:
+    """إعدادات مجمع الاتصالات حسب نوع قاعدة البيانات"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options = {
+            # timeout الخاص بـ sqlite3 هو نفسه busy_timeout
+            "connect_args": {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        }
+        if parsed.database and parsed.database != ":memory:":
+            options.update(
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+            )
+        return options
+
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """إعدادات SQLite لكل اتصال جديد: WAL، انتظار القفل، الذاكرة المؤقتة"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        # القيمة السالبة بالكيلوبايت بدلاً من عدد الصفحات
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def create_database_engine(url: str):
+    """إنشاء محرك قاعدة البيانات بإعدادات الـ pool و SQLite من Settings"""
+    engine = create_engine(url, **engine_options(url))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+    return engine
+
 
 # إنشاء محرك قاعدة البيانات
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine = create_database_engine(settings.DATABASE_URL)
+
+# نسخ القراءة (read replicas)، تُوزع الجلسات عليها بالتناوب
+replica_engines = [create_database_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+_replica_cycle = itertools.cycle(replica_engines)
+
+READ_METHODS = {"GET", "HEAD"}
+_STICKY_KEY_PREFIX = "db_sticky:"
+
+
+class RoutingSession(Session):
+    """جلسة توجه استعلامات القراءة لنسخة قراءة والكتابة للقاعدة الرئيسية
+
+    القراءة من نسخة القراءة فقط إذا فُعلت للجلسة (info["use_replica"])، وهذا ما يفعله
+    get_db لطلبات GET. كل flush وكل INSERT/UPDATE/DELETE تذهب للقاعدة الرئيسية دائماً.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get("use_replica")
+            and replica_engines
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            # نفس النسخة طوال الجلسة حتى تكون القراءات متسقة فيما بينها
+            if "replica" not in self.info:
+                self.info["replica"] = next(_replica_cycle)
+            return self.info["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def sticky_key(request: Request) -> str:
+    """هوية العميل لنافذة قراءة الكتابة: الرمز المميز أو عنوان IP"""
+    identity = request.headers.get("authorization") or (request.client.host if request.client else "")
+    return hashlib.sha256(identity.encode()).hexdigest()[:32]
+
+
+def recently_wrote(key: str) -> bool:
+    from app.core.cache import cache
+    return cache.get(_STICKY_KEY_PREFIX + key) is not None
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _start_sticky_window(session):
+    # العميل الذي كتب يقرأ من القاعدة الرئيسية لفترة قصيرة (تأخر النسخ)، حتى يرى ما كتبه
+    if session.info.pop("wrote", False) and "sticky_key" in session.info:
+        from app.core.cache import cache
+        cache.set(_STICKY_KEY_PREFIX + session.info["sticky_key"], True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
 
 # إنشاء جلسة قاعدة البيانات
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 # إنشاء القاعدة للنماذج
 Base = declarative_base()
 
 # دالة للحصول على جلسة قاعدة البيانات
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    if replica_engines:
+        key = sticky_key(request)
+        db.info["sticky_key"] = key
+        db.info["use_replica"] = request.method in READ_METHODS and not recently_wrote(key)
     try:
         yield db
     finally:
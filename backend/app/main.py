@@ -1,31 +1,22 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.gzip import GZipMiddleware
-from typing import List
+from typing import Optional
 import asyncio
 
+from app.core.config import settings
+from app.core.logging_config import setup_logging, shutdown_logging
+
+setup_logging()
+
 # Database imports
 from app.database.session import get_db, SessionLocal
 from app.database.base import Base
-from app.database.session import engine
-
-# Connection Manager for WebSocket
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+from app.database.session import engine, replica_engines
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
-manager = ConnectionManager()
+from app.core import metrics
+from app.core.notifications import notification_hub
 
 # Import routers
 from app.routers.auth import router as auth_router
@@ -37,6 +28,8 @@ from app.routers.dashboard import router as dashboard_router
 from app.routers.documents import router as documents_router
 from app.routers.alerts import router as alerts_router
 from app.routers.tasks import router as tasks_router
+from app.routers.search import router as search_router
+from app.routers.debug import router as debug_router
 
 # Import models to ensure they are created
 try:
@@ -49,6 +42,8 @@ try:
     from app.models.role import Role
     from app.models.permission import Permission
     from app.models.task import Task
+    from app.models.dashboard_counter import DashboardCounter
+    from app.models.license_expiry_notice import LicenseExpiryNotice
     print("✅ All models imported successfully")
 except Exception as e:
     print(f"❌ Model import error: {e}")
@@ -95,24 +90,85 @@ def add_test_companies():
         print("✅ تم إضافة شركات وموظفين تجريبيين للاختبار")
     db.close()
 
+@app.on_event("startup")
+def rebuild_dashboard_counters():
+    """إعادة بناء عدادات لوحة المعلومات عند تفعيلها"""
+    if not settings.DASHBOARD_COUNTERS_ENABLED:
+        return
+    from app.services.dashboard_stats import rebuild_dashboard_counters as rebuild
+    db = SessionLocal()
+    try:
+        rebuild(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def prepare_search_index():
+    """إنشاء فهرس البحث النصي وبناؤه إذا كان فارغاً"""
+    from app.services import search_index
+
+    def prepare():
+        if not search_index.ensure_search_index(engine) or not search_index.index_is_empty(engine):
+            return
+        db = SessionLocal()
+        try:
+            search_index.rebuild_search_index(db)
+        finally:
+            db.close()
+
+    await asyncio.to_thread(prepare)
+
+@app.on_event("startup")
+async def build_autocomplete_index():
+    """بناء فهرس الإكمال التلقائي للبحث الموحد"""
+    from app.services.autocomplete import build_autocomplete_index as build
+
+    def prepare():
+        db = SessionLocal()
+        try:
+            build(db)
+        finally:
+            db.close()
+
+    await asyncio.to_thread(prepare)
+
 # Add middleware
-from app.core.middleware import ErrorHandlingMiddleware, RequestLoggingMiddleware
-from app.core.security_middleware import RateLimitMiddleware, SecurityHeadersMiddleware, IPFilterMiddleware
+# طبقة ASGI واحدة: معالجة الأخطاء، تسجيل الطلبات، تصفية IP، rate limiting، headers الأمان
+from app.core.pipeline import RequestPipelineMiddleware
+from app.core.file_responses import FileAwareGZipMiddleware
 from app.core.background_tasks import background_tasks
 from app.core.cache import cache
 
-app.add_middleware(ErrorHandlingMiddleware)
-app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(RateLimitMiddleware, calls=100, period=60)  # 100 طلب كل دقيقة
-app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(IPFilterMiddleware)
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(
+    RequestPipelineMiddleware,
+    error_handling=True,
+    access_log=True,
+    ip_filter=True,
+    rate_limit=True,
+    security_headers=True,
+    calls=100,  # 100 طلب كل دقيقة
+    period=60,
+    query_count=settings.SQL_QUERY_COUNT_ENABLED,
+    query_warn_threshold=settings.SQL_QUERY_WARN_THRESHOLD,
+    query_fail_threshold=settings.SQL_QUERY_FAIL_THRESHOLD,
+    server_timing=settings.SQL_PROFILING_ENABLED,
+    collect_metrics=settings.METRICS_ENABLED,
+    max_upload_size=settings.MAX_FILE_SIZE,
+)
+if settings.METRICS_ENABLED:
+    metrics.register_app_metrics(engine, cache, notification_hub)
+if settings.SQL_QUERY_COUNT_ENABLED or settings.SQL_PROFILING_ENABLED:
+    from app.core.query_counter import instrument_engine
+    for db_engine in (engine, *replica_engines):
+        instrument_engine(db_engine, settings.SQL_SLOW_QUERY_TOP_N, settings.SQL_SLOW_QUERY_MS)
+app.add_middleware(FileAwareGZipMiddleware, minimum_size=1000)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-SQL-Queries", "Server-Timing"]
 )
 
 # Include routers واحد بواحد مع معالجة الأخطاء
@@ -126,6 +182,8 @@ routers_to_include = [
     ("documents", "/api/documents", "Documents"),
     ("alerts", "/api/alerts", "Alerts"),
     ("tasks", "/api/tasks", "Tasks"),
+    ("search", "/api/search", "Search"),
+    ("debug", "/api/debug", "Debug"),
 ]
 
 for router_name, prefix, tag in routers_to_include:
@@ -137,13 +195,19 @@ for router_name, prefix, tag in routers_to_include:
             from app.routers.auth import router as auth_router
             app.include_router(auth_router, prefix=prefix, tags=[tag])
         elif router_name == "companies":
-            from app.routers.companies import router as companies_router
+            if router_name in settings.ASYNC_DB_ROUTERS:
+                from app.routers.companies_async import router as companies_router
+            else:
+                from app.routers.companies import router as companies_router
             app.include_router(companies_router, prefix=prefix, tags=[tag])
         elif router_name == "users":
             from app.routers.users import router as users_router
             app.include_router(users_router, prefix=prefix, tags=[tag])
         elif router_name == "employees":
-            from app.routers.employees import router as employees_router
+            if router_name in settings.ASYNC_DB_ROUTERS:
+                from app.routers.employees_async import router as employees_router
+            else:
+                from app.routers.employees import router as employees_router
             app.include_router(employees_router, prefix=prefix, tags=[tag])
         elif router_name == "licenses":
             from app.routers.licenses import router as licenses_router
@@ -157,6 +221,12 @@ for router_name, prefix, tag in routers_to_include:
         elif router_name == "tasks":
             from app.routers.tasks import router as tasks_router
             app.include_router(tasks_router, prefix=prefix, tags=[tag])
+        elif router_name == "search":
+            from app.routers.search import router as search_router
+            app.include_router(search_router, prefix=prefix, tags=[tag])
+        elif router_name == "debug":
+            from app.routers.debug import router as debug_router
+            app.include_router(debug_router, prefix=prefix, tags=[tag])
         print(f"✅ {router_name} router loaded")
     except Exception as e:
         print(f"❌ {router_name} router error: {e}")
@@ -167,15 +237,41 @@ for router_name, prefix, tag in routers_to_include:
 # - documents
 # - alerts
 
+def _websocket_user(token: str):
+    """(user_id, company_id) لصاحب الرمز أو None، ويعمل في threadpool لأن الاستعلام متزامن"""
+    from app.core.security import verify_token
+    from app.crud.user import get_user_by_username
+
+    username = verify_token(token)
+    if not username:
+        return None
+    db = SessionLocal()
+    try:
+        user = get_user_by_username(db, username=username)
+        return (user.id, user.company_id) if user is not None else None
+    finally:
+        db.close()
+
 # WebSocket endpoint for real-time notifications
 @app.websocket("/ws/notifications")
-async def websocket_notifications(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_notifications(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """الاتصال بدون رمز يستقبل الإشعارات العامة فقط، ومع الرمز يستقبل إشعارات المستخدم وشركته"""
+    user_id = company_id = None
+    if token:
+        user = await run_in_threadpool(_websocket_user, token)
+        if user is None:
+            await websocket.close(code=1008)
+            return
+        user_id, company_id = user
+
+    connection = await notification_hub.connect(websocket, user_id=user_id, company_id=company_id)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
+    finally:
+        await notification_hub.disconnect(connection)
 
 # Health check endpoints
 @app.get("/")
@@ -186,11 +282,44 @@ def read_root():
 def health_check():
     return {"status": "healthy", "message": "النظام يعمل بشكل طبيعي"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """مقاييس التطبيق بصيغة Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="المقاييس غير مفعلة")
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/api/ping")
 def ping():
     return {"pong": True}
 
 # Startup and shutdown events
+@app.on_event("startup")
+async def start_notifications():
+    await notification_hub.start()
+    # المهام الخلفية (فحص انتهاء الرخص...) ترسل إشعاراتها عبر مركز الإشعارات
+    app.state.background_tasks = asyncio.create_task(background_tasks.start_all_tasks())
+
+@app.on_event("shutdown")
+async def stop_notifications():
+    background_tasks.stop_all_tasks()
+    app.state.background_tasks.cancel()
+    await notification_hub.stop()
+
+@app.on_event("shutdown")
+def stop_thumbnail_workers():
+    from app.services.thumbnails import thumbnail_pipeline
+    thumbnail_pipeline.shutdown()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    from app.database.async_session import dispose_async_engine
+    await dispose_async_engine()
+
+@app.on_event("shutdown")
+def flush_logs():
+    """كتابة السجلات المتبقية في الطابور قبل الإغلاق"""
+    shutdown_logging()
 
 
 
@@ -7,6 +7,8 @@ from .license import License, LicenseType, LicenseStatus
 from .employee import Employee, EmployeeStatus, Gender, MaritalStatus
 from .document import Document, DocumentType, EntityType, DocumentStatus
 from .alert import Alert
+from .dashboard_counter import DashboardCounter
+from .license_expiry_notice import LicenseExpiryNotice
 
 # تصدير جميع النماذج والجداول المساعدة
 __all__ = [
@@ -19,6 +21,8 @@ __all__ = [
     "Employee",
     "Document",
     "Alert",
+    "DashboardCounter",
+    "LicenseExpiryNotice",
     
     # الجداول المساعدة
     "user_permissions",
@@ -38,3 +42,6 @@ __all__ = [
     "DEFAULT_ROLES",
     "DEFAULT_PERMISSIONS"
 ]
+
+# تفعيل إبطال الـ cache تلقائياً عند تعديل النماذج
+from app.core import cache_invalidation  # noqa: E402,F401
@@ -28,7 +28,7 @@ class Alert(Base):
     alert_type = Column(Enum(AlertType), nullable=False)
     priority = Column(Enum(AlertPriority), default=AlertPriority.MEDIUM)
     
-    is_read = Column(Boolean, default=False)
+    is_read = Column(Boolean, default=False, index=True)
     is_resolved = Column(Boolean, default=False)
     
     # التاريخ المرتبط بالتنبيه (مثل تاريخ انتهاء الرخصة)
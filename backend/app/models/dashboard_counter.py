@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.sql import func
+from app.database.base import Base
+
+class DashboardCounter(Base):
+    """عدادات لوحة المعلومات المحدثة تدريجياً مع كل تعديل على الجداول"""
+    __tablename__ = "dashboard_counters"
+
+    # اسم العداد مثل licenses.total أو licenses.expiry
+    name = Column(String(50), primary_key=True)
+    # فئة العداد: فارغة للعدادات العامة، أو تاريخ الانتهاء (YYYY-MM-DD) لعدادات الرخص
+    bucket = Column(String(10), primary_key=True, default="")
+    value = Column(BigInteger, nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<DashboardCounter(name='{self.name}', bucket='{self.bucket}', value={self.value})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, BigInteger, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, BigInteger, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -51,6 +51,10 @@ class DocumentStatus(enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # وثائق كيان معين: WHERE entity_type = ... AND entity_id = ...
+        Index("ix_documents_entity_type_entity_id", "entity_type", "entity_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -64,6 +68,7 @@ class Document(Base):
     file_size = Column(BigInteger)  # حجم الملف بالبايت
     mime_type = Column(String(100))
     file_extension = Column(String(10))
+    content_hash = Column(String(64), index=True)  # SHA-256 للمحتوى، مفتاح الملف في مخزن الـ blobs
     
     # نوع المستند
     file_type = Column(String(100), nullable=False)  # النوع المحدد من القائمة
@@ -78,6 +83,7 @@ class Document(Base):
     description = Column(Text)
     notes = Column(Text)
     tags = Column(Text)  # JSON string للعلامات
+    extracted_text = Column(Text)  # النص المستخرج من الملف (OCR) للبحث النصي
     
     # معلومات الحالة
     status = Column(Enum(DocumentStatus), default=DocumentStatus.ACTIVE)
@@ -90,7 +90,7 @@ class Employee(Base):
     
     # المفاتيح الخارجية
     user_id = Column(Integer, ForeignKey("users.id"), unique=True)
-    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
     
     # العلاقات
     user = relationship("User", back_populates="employee")
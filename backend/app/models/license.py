@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Date, ForeignKey, Enum, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Date, ForeignKey, Enum, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -28,6 +28,10 @@ class LicenseStatus(enum.Enum):
 
 class License(Base):
     __tablename__ = "licenses"
+    __table_args__ = (
+        # فحص انتهاء الصلاحية: WHERE status = ... AND expiry_date < ...
+        Index("ix_licenses_status_expiry_date", "status", "expiry_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -39,7 +43,7 @@ class License(Base):
     
     # معلومات التواريخ
     issue_date = Column(Date, nullable=False)
-    expiry_date = Column(Date, nullable=False)
+    expiry_date = Column(Date, nullable=False, index=True)
     renewal_date = Column(Date)
     last_renewal_date = Column(Date)
     next_renewal_due = Column(Date)
@@ -78,7 +82,7 @@ class License(Base):
     
     # المفاتيح الخارجية
     company_id = Column(Integer, ForeignKey("companies.id"))
-    employee_id = Column(Integer, ForeignKey("employees.id"))
+    employee_id = Column(Integer, ForeignKey("employees.id"), index=True)
     parent_license_id = Column(Integer, ForeignKey("licenses.id"))  # رخصة أصلية إذا كانت هذه تجديد
     
     # العلاقات
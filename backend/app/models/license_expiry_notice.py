@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database.base import Base
+
+class LicenseExpiryNotice(Base):
+    """إشعارات انتهاء الرخص المرسلة، حتى يُرسل كل مستوى مرة واحدة فقط لكل تاريخ انتهاء"""
+    __tablename__ = "license_expiry_notices"
+
+    license_id = Column(Integer, ForeignKey("licenses.id", ondelete="CASCADE"), primary_key=True)
+    # مستوى الإشعار: info (خلال 30 يوم)، warning (خلال 7 أيام)، expired
+    tier = Column(String(10), primary_key=True)
+    # تجديد الرخصة يغير تاريخ الانتهاء فتُرسل الإشعارات من جديد
+    expiry_date = Column(Date, primary_key=True)
+
+    notified_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<LicenseExpiryNotice(license_id={self.license_id}, tier='{self.tier}', expiry_date='{self.expiry_date}')>"
@@ -1,24 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database.session import get_db
-from app.models.alert import Alert
+from app.models.alert import Alert, AlertPriority, AlertType
 from app.schemas.alert import AlertCreate, AlertUpdate, AlertResponse
 from app.core.security import get_current_user
+from app.core.pagination import paginate
 from app.models.user import User
+from app.services.notification_events import publish_alert_created, publish_unread_count
 
 router = APIRouter()
 
+# الكيان المرتبط بالتنبيه في الـ schema -> العمود في النموذج
+ENTITY_COLUMNS = {
+    "company": "company_id",
+    "employee": "employee_id",
+    "license": "license_id",
+    "user": "user_id",
+}
+
+def _alert_columns(data: dict) -> dict:
+    """تحويل حقول الـ schema إلى أعمدة نموذج التنبيه"""
+    entity_type = data.pop("entity_type", None)
+    entity_id = data.pop("entity_id", None)
+    if entity_type in ENTITY_COLUMNS and entity_id is not None:
+        data[ENTITY_COLUMNS[entity_type]] = entity_id
+
+    try:
+        if data.get("alert_type") is not None:
+            data["alert_type"] = AlertType(getattr(data["alert_type"], "value", data["alert_type"]))
+        if data.get("priority") is not None:
+            data["priority"] = AlertPriority(data["priority"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"قيمة غير صالحة: {e}")
+    return data
+
 @router.get("/", response_model=List[AlertResponse])
 def get_alerts(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """جلب جميع التنبيهات"""
-    alerts = db.query(Alert).offset(skip).limit(limit).all()
+    alerts = paginate(db.query(Alert), Alert.id, limit, cursor=cursor, offset=skip, response=response)
     return alerts
 
 @router.get("/{alert_id}", response_model=AlertResponse)
@@ -40,10 +68,13 @@ def create_alert(
     current_user: User = Depends(get_current_user)
 ):
     """إنشاء تنبيه جديد"""
-    db_alert = Alert(**alert.dict())
+    db_alert = Alert(**_alert_columns(alert.dict()))
     db.add(db_alert)
     db.commit()
     db.refresh(db_alert)
+    publish_alert_created(db_alert)
+    if not db_alert.is_read:
+        publish_unread_count(db)
     return db_alert
 
 @router.put("/{alert_id}", response_model=AlertResponse)
@@ -58,11 +89,14 @@ def update_alert(
     if not alert:
         raise HTTPException(status_code=404, detail="التنبيه غير موجود")
     
-    for field, value in alert_update.dict(exclude_unset=True).items():
+    was_read = alert.is_read
+    for field, value in _alert_columns(alert_update.dict(exclude_unset=True)).items():
         setattr(alert, field, value)
     
     db.commit()
     db.refresh(alert)
+    if alert.is_read != was_read:
+        publish_unread_count(db)
     return alert
 
 @router.delete("/{alert_id}")
@@ -76,8 +110,11 @@ def delete_alert(
     if not alert:
         raise HTTPException(status_code=404, detail="التنبيه غير موجود")
     
+    was_unread = not alert.is_read
     db.delete(alert)
     db.commit()
+    if was_unread:
+        publish_unread_count(db)
     return {"message": "تم حذف التنبيه بنجاح"}
 
 @router.put("/{alert_id}/read")
@@ -91,9 +128,12 @@ def mark_alert_as_read(
     if not alert:
         raise HTTPException(status_code=404, detail="التنبيه غير موجود")
     
+    was_read = alert.is_read
     alert.is_read = True
     db.commit()
     db.refresh(alert)
+    if not was_read:
+        publish_unread_count(db)
     return alert
 
 @router.get("/unread/count")
@@ -1,23 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database.session import get_db
 from app.models.company import Company
 from app.schemas.company import CompanyCreate, CompanyUpdate, CompanyResponse
 from app.core.security import get_current_user
+from app.core.pagination import paginate
 from app.models.user import User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[CompanyResponse])
 def get_companies(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """جلب جميع الشركات"""
-    companies = db.query(Company).offset(skip).limit(limit).all()
+    companies = paginate(db.query(Company), Company.id, limit, cursor=cursor, offset=skip, response=response)
     return companies
 
 @router.get("/{company_id}", response_model=CompanyResponse)
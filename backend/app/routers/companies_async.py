@@ -0,0 +1,82 @@
+"""نسخة غير متزامنة من router الشركات (AsyncSession)، تُفعل عبر ASYNC_DB_ROUTERS"""
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.database.async_session import get_async_db
+from app.models.company import Company
+from app.schemas.company import CompanyCreate, CompanyUpdate, CompanyResponse
+from app.core.security import get_current_user
+from app.core.pagination import paginate_async
+from app.models.user import User
+
+router = APIRouter()
+
+async def _get_company_or_404(db: AsyncSession, company_id: int) -> Company:
+    company = await db.get(Company, company_id)
+    if not company:
+        raise HTTPException(status_code=404, detail="الشركة غير موجودة")
+    return company
+
+@router.get("/", response_model=List[CompanyResponse])
+async def get_companies(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """جلب جميع الشركات"""
+    companies = await paginate_async(db, select(Company), Company.id, limit, cursor=cursor, offset=skip, response=response)
+    return companies
+
+@router.get("/{company_id}", response_model=CompanyResponse)
+async def get_company(
+    company_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """جلب شركة بالمعرف"""
+    return await _get_company_or_404(db, company_id)
+
+@router.post("/", response_model=CompanyResponse)
+async def create_company(
+    company: CompanyCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """إنشاء شركة جديدة"""
+    db_company = Company(**company.dict())
+    db.add(db_company)
+    await db.commit()
+    await db.refresh(db_company)
+    return db_company
+
+@router.put("/{company_id}", response_model=CompanyResponse)
+async def update_company(
+    company_id: int,
+    company_update: CompanyUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """تحديث شركة"""
+    company = await _get_company_or_404(db, company_id)
+
+    for field, value in company_update.dict(exclude_unset=True).items():
+        setattr(company, field, value)
+
+    await db.commit()
+    await db.refresh(company)
+    return company
+
+@router.delete("/{company_id}")
+async def delete_company(
+    company_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """حذف شركة"""
+    company = await _get_company_or_404(db, company_id)
+
+    await db.delete(company)
+    await db.commit()
+    return {"message": "تم حذف الشركة بنجاح"}
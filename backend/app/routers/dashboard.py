@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 
 from app.database.session import get_db
 from app.models.employee import Employee
@@ -10,54 +10,16 @@ from app.models.license import License
 from app.models.document import Document
 from app.core.security import get_current_user
 from app.models.user import User
+from app.services import dashboard_stats
 
 router = APIRouter()
 
 @router.get("/stats")
 def get_dashboard_stats(
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """جلب إحصائيات لوحة المعلومات"""
-    
-    # إحصائيات عامة
-    total_companies = db.query(Company).count()
-    total_employees = db.query(Employee).count()
-    total_licenses = db.query(License).count()
-    total_documents = db.query(Document).count()
-    
-    # إحصائيات الشركات النشطة
-    active_companies = db.query(Company).filter(Company.is_active == True).count()
-    
-    # إحصائيات الموظفين النشطين
-    active_employees = db.query(Employee).filter(Employee.is_active == True).count()
-    
-    # إحصائيات الرخص
-    valid_licenses = db.query(License).filter(
-        License.expiry_date > datetime.now()
-    ).count()
-    
-    expired_licenses = db.query(License).filter(
-        License.expiry_date <= datetime.now()
-    ).count()
-    
-    # الرخص التي ستنتهي خلال 30 يوم
-    expiring_soon = db.query(License).filter(
-        License.expiry_date > datetime.now(),
-        License.expiry_date <= datetime.now() + timedelta(days=30)
-    ).count()
-    
-    return {
-        "total_companies": total_companies,
-        "active_companies": active_companies,
-        "total_employees": total_employees,
-        "active_employees": active_employees,
-        "total_licenses": total_licenses,
-        "valid_licenses": valid_licenses,
-        "expired_licenses": expired_licenses,
-        "expiring_soon": expiring_soon,
-        "total_documents": total_documents
-    }
+    return dashboard_stats.get_dashboard_stats()
 
 @router.get("/recent-activity")
 def get_recent_activity(
@@ -67,13 +29,19 @@ def get_recent_activity(
 ):
     """جلب النشاطات الأخيرة"""
     
+    # العلاقات تُحمل مع الصفوف في نفس الاستعلام (JOIN) بدلاً من استعلام لكل صف
     # أحدث الموظفين المضافين
-    recent_employees = db.query(Employee).order_by(
+    recent_employees = db.query(Employee).options(
+        joinedload(Employee.company)
+    ).order_by(
         Employee.created_at.desc()
     ).limit(limit).all()
     
     # أحدث الرخص المضافة
-    recent_licenses = db.query(License).order_by(
+    recent_licenses = db.query(License).options(
+        joinedload(License.employee),
+        joinedload(License.company)
+    ).order_by(
         License.created_at.desc()
     ).limit(limit).all()
     
@@ -96,9 +64,12 @@ def get_license_expiry_alerts(
 ):
     """جلب تنبيهات انتهاء الرخص"""
     
-    expiring_licenses = db.query(License).filter(
-        License.expiry_date > datetime.now(),
-        License.expiry_date <= datetime.now() + timedelta(days=days)
+    expiring_licenses = db.query(License).options(
+        joinedload(License.employee),
+        joinedload(License.company)
+    ).filter(
+        License.expiry_date >= date.today(),
+        License.expiry_date <= date.today() + timedelta(days=days)
     ).all()
     
     return {
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.config import settings
+from app.core.query_counter import slow_query_log
+from app.core.security import get_current_user
+from app.models.user import User
+
+router = APIRouter()
+
+def get_admin_user(current_user: User = Depends(get_current_user)):
+    """السماح للمدير فقط"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="هذه العملية متاحة للمدير فقط")
+    return current_user
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    order_by: str = Query("total_ms", pattern="^(total_ms|max_ms|count)$"),
+    current_user: User = Depends(get_admin_user)
+):
+    """أبطأ استعلامات SQL منذ بدء التشغيل (أو آخر مسح)"""
+    return {
+        "enabled": settings.SQL_PROFILING_ENABLED,
+        "threshold_ms": settings.SQL_SLOW_QUERY_MS,
+        "queries": slow_query_log.top(limit, order_by),
+    }
+
+@router.delete("/slow-queries")
+def reset_slow_queries(current_user: User = Depends(get_admin_user)):
+    """مسح جدول أبطأ الاستعلامات"""
+    slow_query_log.reset()
+    return {"message": "تم مسح جدول الاستعلامات البطيئة"}
@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
-import shutil
-from datetime import datetime
 
 from app.database.session import get_db
-from app.models.document import Document
+from app.models.document import Document, EntityType
 from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentResponse
 from app.core.security import get_current_user
+from app.core.pagination import NEXT_CURSOR_HEADER, paginate, paginate_counted
+from app.core.cache import cache
+from app.core.file_responses import file_response
+from app.services import search_index
+from app.services.file_storage import check_extension, discard_upload, ensure_blob, release_blob, store_upload
+from app.services.thumbnails import THUMBNAIL_SIZES, preview_kind, thumbnail_path, thumbnail_pipeline
 from app.models.user import User
 
 router = APIRouter()
@@ -18,25 +23,95 @@ router = APIRouter()
 UPLOAD_DIR = "uploaded_files"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-@router.get("/", response_model=List[DocumentResponse])
+# مدة حفظ العدد الكلي لنتائج القوائم والبحث (يُبطل قبلها عند تعديل أي وثيقة)
+DOCUMENT_TOTAL_CACHE_SECONDS = 300
+
+def _documents_page(
+    query,
+    response: Response,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    include_total: bool,
+    total_key: str,
+    ranked: bool = False,
+) -> dict:
+    """صفحة وثائق مع العدد الكلي دون فحص الجدول مرتين
+
+    العدد يُحفظ في الـ cache (يُبطل عند أي تعديل على الوثائق) فلا تعيد الصفحات
+    التالية حسابه، وعند عدم وجوده يُقرأ مع الصفحة نفسها عبر COUNT(*) OVER().
+    النتائج المرتبة حسب الصلة (ranked) تُتصفح بالصفحات فقط دون مؤشر.
+    """
+    skip = (page - 1) * page_size
+    page_response = None if ranked else response
+    total = cache.get(total_key) if include_total else None
+    cached = total is not None
+
+    if include_total and not cached and not cursor:
+        documents, total = paginate_counted(query, Document.id, page_size, offset=skip, response=page_response)
+    else:
+        documents = paginate(query, Document.id, page_size, cursor=cursor, offset=skip, response=page_response)
+
+    if include_total and total is None:
+        # وضع المؤشر أو صفحة بعد نهاية النتائج
+        total = query.count()
+    if include_total and not cached:
+        cache.set(total_key, total, expire_seconds=DOCUMENT_TOTAL_CACHE_SECONDS, tags=["documents"])
+
+    return {
+        "items": documents,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (total + page_size - 1) // page_size if total is not None else None,
+        "next_cursor": response.headers.get(NEXT_CURSOR_HEADER)
+    }
+
+@router.get("/")
 def get_documents(
+    response: Response,
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """جلب جميع الوثائق مع الصفحات"""
-    skip = (page - 1) * page_size
-    documents = db.query(Document).offset(skip).limit(page_size).all()
-    total = db.query(Document).count()
+    return _documents_page(
+        db.query(Document), response, page, page_size, cursor, include_total,
+        cache._generate_key("documents:total"),
+    )
+
+@router.get("/search")
+def search_documents(
+    response: Response,
+    search: str,
+    entity_type: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """البحث في الوثائق"""
+    query = db.query(Document)
     
-    return {
-        "items": documents,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "pages": (total + page_size - 1) // page_size
-    }
+    # البحث في الاسم والوصف والنص المستخرج عبر فهرس البحث النصي
+    ranked = bool(search) and not cursor
+    if search:
+        query = search_index.match(query, Document, search, ranked=ranked)
+    
+    # فلترة حسب نوع الكيان
+    if entity_type:
+        query = query.filter(Document.entity_type == entity_type)
+    
+    return _documents_page(
+        query, response, page, page_size, cursor, include_total,
+        cache._generate_key("documents:search:total", search, entity_type),
+        ranked=ranked,
+    )
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 def get_document(
@@ -50,49 +125,68 @@ def get_document(
         raise HTTPException(status_code=404, detail="الوثيقة غير موجودة")
     return document
 
-@router.post("/upload", response_model=DocumentResponse)
+def _save_document(db: Session, document: Document) -> Document:
+    db.add(document)
+    db.commit()
+    db.refresh(document)
+    return document
+
+def _release_after_failure(db: Session, content_hash: str):
+    db.rollback()
+    release_blob(db, content_hash)
+
+@router.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
     entity_type: str = Form(...),
     entity_id: int = Form(...),
     title: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
+    file_type: str = Form("other"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """رفع وثيقة جديدة"""
-    
-    # إنشاء مجلد للكيان إذا لم يكن موجوداً
-    entity_dir = os.path.join(UPLOAD_DIR, entity_type)
-    os.makedirs(entity_dir, exist_ok=True)
-    
-    # إنشاء اسم فريد للملف
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_extension = os.path.splitext(file.filename)[1]
-    filename = f"{entity_type}_{entity_id}_{timestamp}_{file.filename}"
-    file_path = os.path.join(entity_dir, filename)
-    
-    # حفظ الملف
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # إنشاء سجل في قاعدة البيانات
+    try:
+        entity = EntityType(entity_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="نوع الكيان غير صالح")
+
+    # التحقق من الامتداد قبل قراءة المحتوى
+    original_name = os.path.basename(file.filename or "")
+    extension = check_extension(original_name)
+
+    # المحتوى المكرر لا يُكتب مرة أخرى، السجل الجديد يشير لنفس الـ blob
+    stored = await store_upload(file)
+
+    # إنشاء سجل في قاعدة البيانات (الجلسة متزامنة، فتعمل في الـ threadpool)
     document = Document(
-        title=title or file.filename,
+        name=title or original_name,
+        original_filename=original_name,
         description=description,
-        file_name=filename,
-        file_path=file_path,
-        file_size=os.path.getsize(file_path),
+        file_path=stored.path,
+        file_size=stored.size,
         mime_type=file.content_type,
-        entity_type=entity_type,
+        file_extension=extension,
+        content_hash=stored.sha256,
+        file_type=file_type,
+        entity_type=entity,
         entity_id=entity_id,
         uploaded_by=current_user.id
     )
-    
-    db.add(document)
-    db.commit()
-    db.refresh(document)
-    
+    try:
+        document = await run_in_threadpool(_save_document, db, document)
+    except Exception:
+        await discard_upload(stored)
+        await run_in_threadpool(_release_after_failure, db, stored.sha256)
+        raise
+
+    # حذف متزامن لآخر وثيقة بنفس المحتوى قد يحذف الـ blob قبل حفظ السجل
+    await ensure_blob(stored)
+
+    # المعاينات تُنشأ في process pool بعد الاستجابة (الموجودة مسبقاً للمكرر تُتجاهل)
+    thumbnail_pipeline.enqueue(stored.sha256, stored.path, extension)
+
     return document
 
 @router.put("/{document_id}", response_model=DocumentResponse)
@@ -125,14 +219,19 @@ def delete_document(
     if not document:
         raise HTTPException(status_code=404, detail="الوثيقة غير موجودة")
     
-    # حذف الملف من النظام
-    if os.path.exists(document.file_path):
-        os.remove(document.file_path)
-    
+    content_hash = document.content_hash
+    file_path = document.file_path
+
     # حذف السجل من قاعدة البيانات
     db.delete(document)
     db.commit()
-    
+
+    # حذف الملف من النظام: الـ blob فقط إذا لم تعد أي وثيقة تشير إليه
+    if content_hash:
+        release_blob(db, content_hash)
+    elif os.path.exists(file_path):
+        os.remove(file_path)
+
     return {"message": "تم حذف الوثيقة بنجاح"}
 
 @router.get("/entity/{entity_type}/{entity_id}", response_model=List[DocumentResponse])
@@ -149,58 +248,64 @@ def get_documents_by_entity(
     ).all()
     return documents
 
-@router.get("/search")
-def search_documents(
-    search: str,
-    entity_type: Optional[str] = None,
-    page: int = 1,
-    page_size: int = 20,
+@router.get("/{document_id}/download")
+def download_document(
+    document_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """البحث في الوثائق"""
-    query = db.query(Document)
-    
-    # البحث في العنوان والوصف
-    if search:
-        query = query.filter(
-            (Document.title.ilike(f"%{search}%")) |
-            (Document.description.ilike(f"%{search}%"))
-        )
-    
-    # فلترة حسب نوع الكيان
-    if entity_type:
-        query = query.filter(Document.entity_type == entity_type)
-    
-    # تطبيق الصفحات
-    skip = (page - 1) * page_size
-    documents = query.offset(skip).limit(page_size).all()
-    total = query.count()
-    
-    return {
-        "items": documents,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "pages": (total + page_size - 1) // page_size
-    }
+    """تحميل وثيقة (يدعم Range و ETag للمعاينة والاستكمال)"""
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="الوثيقة غير موجودة")
 
-@router.get("/{document_id}/download")
-def download_document(
+    return file_response(
+        request,
+        document.file_path,
+        filename=document.original_filename,
+        media_type=document.mime_type,
+        content_hash=document.content_hash,
+    )
+
+@router.get("/{document_id}/thumbnail")
+def get_document_thumbnail(
     document_id: int,
+    request: Request,
+    size: str = "medium",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """تحميل وثيقة"""
+    """معاينة الوثيقة المصغرة (WebP)، أو 202 إذا كانت قيد الإنشاء"""
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"حجم غير مدعوم (المتاح: {', '.join(THUMBNAIL_SIZES)})")
+
     document = db.query(Document).filter(Document.id == document_id).first()
     if not document:
         raise HTTPException(status_code=404, detail="الوثيقة غير موجودة")
-    
-    if not os.path.exists(document.file_path):
-        raise HTTPException(status_code=404, detail="الملف غير موجود")
-    
-    return FileResponse(
-        path=document.file_path,
-        filename=document.file_name,
-        media_type=document.mime_type
+    if not document.content_hash or preview_kind(document.file_extension) is None:
+        raise HTTPException(status_code=404, detail="لا توجد معاينة لهذه الوثيقة")
+
+    path = thumbnail_path(document.content_hash, size)
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        # لم تُنشأ بعد (أو رُفعت قبل تفعيل المعاينات): نضيفها للطابور
+        if not thumbnail_pipeline.enqueue(document.content_hash, document.file_path, document.file_extension):
+            raise HTTPException(status_code=404, detail="لا توجد معاينة لهذه الوثيقة")
+        return JSONResponse(
+            status_code=202,
+            content={"status": "pending"},
+            headers={"Retry-After": "2", "Cache-Control": "no-store"},
+        )
+
+    name = os.path.splitext(document.original_filename)[0]
+    return file_response(
+        request,
+        path,
+        filename=f"{name}-{size}.webp",
+        media_type="image/webp",
+        content_hash=f"{document.content_hash}.{size}",
+        disposition="inline",
+        stat_result=stat_result,
     )
@@ -1,23 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database.session import get_db
 from app.models.employee import Employee
 from app.schemas.employee import EmployeeCreate, EmployeeUpdate, EmployeeResponse
 from app.core.security import get_current_user
+from app.core.pagination import paginate
+from app.services import search_index
 from app.models.user import User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[EmployeeResponse])
 def get_employees(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """جلب جميع الموظفين"""
-    employees = db.query(Employee).offset(skip).limit(limit).all()
+    query = db.query(Employee)
+    # بدون مؤشر تُرتب نتائج البحث حسب الصلة (ولا يوجد مؤشر للصفحة التالية)
+    ranked = bool(search) and not cursor
+    if search:
+        query = search_index.match(query, Employee, search, ranked=ranked)
+    employees = paginate(query, Employee.id, limit, cursor=cursor, offset=skip, response=None if ranked else response)
     return employees
 
 @router.get("/{employee_id}", response_model=EmployeeResponse)
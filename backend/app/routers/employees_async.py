@@ -0,0 +1,102 @@
+"""نسخة غير متزامنة من router الموظفين (AsyncSession)، تُفعل عبر ASYNC_DB_ROUTERS"""
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.database.async_session import get_async_db
+from app.database.session import engine
+from app.models.employee import Employee
+from app.schemas.employee import EmployeeCreate, EmployeeUpdate, EmployeeResponse
+from app.core.security import get_current_user
+from app.core.pagination import paginate_async
+from app.services import search_index
+from app.models.user import User
+
+router = APIRouter()
+
+async def _get_employee_or_404(db: AsyncSession, employee_id: int) -> Employee:
+    employee = await db.get(Employee, employee_id)
+    if not employee:
+        raise HTTPException(status_code=404, detail="الموظف غير موجود")
+    return employee
+
+@router.get("/", response_model=List[EmployeeResponse])
+async def get_employees(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """جلب جميع الموظفين"""
+    statement = select(Employee)
+    # بدون مؤشر تُرتب نتائج البحث حسب الصلة (ولا يوجد مؤشر للصفحة التالية)
+    ranked = bool(search) and not cursor
+    if search:
+        # نوع الفهرس يُعرف من المحرك المتزامن لنفس القاعدة
+        statement = search_index.match(statement, Employee, search, ranked=ranked, bind=engine)
+    employees = await paginate_async(db, statement, Employee.id, limit, cursor=cursor, offset=skip, response=None if ranked else response)
+    return employees
+
+@router.get("/{employee_id}", response_model=EmployeeResponse)
+async def get_employee(
+    employee_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """جلب موظف بالمعرف"""
+    return await _get_employee_or_404(db, employee_id)
+
+@router.post("/", response_model=EmployeeResponse)
+async def create_employee(
+    employee: EmployeeCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """إنشاء موظف جديد"""
+    db_employee = Employee(**employee.dict())
+    db.add(db_employee)
+    await db.commit()
+    await db.refresh(db_employee)
+    return db_employee
+
+@router.put("/{employee_id}", response_model=EmployeeResponse)
+async def update_employee(
+    employee_id: int,
+    employee_update: EmployeeUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """تحديث موظف"""
+    employee = await _get_employee_or_404(db, employee_id)
+
+    for field, value in employee_update.dict(exclude_unset=True).items():
+        setattr(employee, field, value)
+
+    await db.commit()
+    await db.refresh(employee)
+    return employee
+
+@router.delete("/{employee_id}")
+async def delete_employee(
+    employee_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """حذف موظف"""
+    employee = await _get_employee_or_404(db, employee_id)
+
+    await db.delete(employee)
+    await db.commit()
+    return {"message": "تم حذف الموظف بنجاح"}
+
+@router.get("/company/{company_id}", response_model=List[EmployeeResponse])
+async def get_employees_by_company(
+    company_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """جلب موظفي شركة معينة"""
+    employees = (await db.scalars(select(Employee).filter(Employee.company_id == company_id))).all()
+    return employees
@@ -1,24 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database.session import get_db
 from app.models.license import License
 from app.schemas.license import LicenseCreate, LicenseUpdate, LicenseResponse
 from app.core.security import get_current_user
+from app.core.pagination import paginate
+from app.services import search_index
 from app.models.user import User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[LicenseResponse])
 def get_licenses(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """جلب جميع الرخص"""
-    licenses = db.query(License).offset(skip).limit(limit).all()
+    query = db.query(License)
+    # بدون مؤشر تُرتب نتائج البحث حسب الصلة (ولا يوجد مؤشر للصفحة التالية)
+    ranked = bool(search) and not cursor
+    if search:
+        query = search_index.match(query, License, search, ranked=ranked)
+    licenses = paginate(query, License.id, limit, cursor=cursor, offset=skip, response=None if ranked else response)
     return licenses
 
 @router.get("/{license_id}", response_model=LicenseResponse)
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional, Set
+
+from app.database.session import get_db
+from app.models.company import Company
+from app.models.document import Document
+from app.models.employee import Employee
+from app.models.license import License
+from app.core.security import get_current_user
+from app.services import search_index
+from app.services.autocomplete import SOURCES as AUTOCOMPLETE_SOURCES, autocomplete_index
+from app.models.user import User
+
+router = APIRouter()
+
+# النوع -> (النموذج، حقل العنوان)
+SEARCH_TYPES = {
+    "employee": (Employee, "full_name"),
+    "license": (License, "license_number"),
+    "company": (Company, "name"),
+    "document": (Document, "name"),
+}
+
+# الأنواع التي يغطيها فهرس البادئات، وما عداها (الوثائق) يُبحث عنه في قاعدة البيانات دائماً
+INDEXED_TYPES = {entity_type for entity_type, _, _ in AUTOCOMPLETE_SOURCES.values()}
+
+def _database_results(db: Session, q: str, limit: int, types: Set[str], found: Set) -> List[dict]:
+    """ما لا يغطيه فهرس البادئات: المطابقة داخل النص ونص الوثائق"""
+    results = []
+    for entity_type, (model, label_field) in SEARCH_TYPES.items():
+        if entity_type not in types or len(results) >= limit:
+            continue
+        query = db.query(model.id, getattr(model, label_field))
+        if model.__tablename__ in search_index.SOURCES:
+            query = search_index.match(query, model, q)
+        else:
+            query = query.filter(getattr(model, label_field).ilike(f"%{q}%")).order_by(model.id)
+        for entity_id, label in query.limit(limit + len(found)).all():
+            if (entity_type, entity_id) in found:
+                continue
+            results.append({"type": entity_type, "id": entity_id, "label": label})
+            if len(results) >= limit:
+                break
+    return results
+
+@router.get("/")
+def global_search(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    types: Optional[str] = None,
+    deep: bool = Query(False, description="إضافة المطابقة داخل النص من قاعدة البيانات للأنواع المفهرسة"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """البحث الموحد: اقتراحات من فهرس البادئات، وقاعدة البيانات للوثائق فقط
+
+    قاعدة البيانات تُستخدم للأنواع المفهرسة فقط إذا لم يجد الفهرس شيئاً أو مع
+    deep=true، حتى لا تكلف كل ضغطة مفتاح استعلامات FTS/ILIKE.
+    """
+    wanted = set(types.split(",")) if types else set(SEARCH_TYPES)
+    unknown = wanted - set(SEARCH_TYPES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"نوع بحث غير مدعوم: {', '.join(sorted(unknown))}")
+
+    if autocomplete_index.ready:
+        results = autocomplete_index.search(q, limit, wanted)
+        fallback = wanted if deep or not results else wanted - INDEXED_TYPES
+    else:
+        results, fallback = [], wanted
+
+    source = "index"
+    if fallback and len(results) < limit:
+        found = {(result["type"], result["id"]) for result in results}
+        extra = _database_results(db, q, limit - len(results), fallback, found)
+        if extra:
+            source = "index+database" if results else "database"
+            results.extend(extra)
+
+    return {"query": q, "results": results, "source": source}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -6,14 +6,17 @@ from app.database.session import get_db
 from app.models.task import Task
 from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
 from app.core.security import get_current_user
+from app.core.pagination import paginate
 from app.models.user import User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[TaskResponse])
 def get_tasks(
+    response: Response,
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
     priority: Optional[str] = None,
     current_user: User = Depends(get_current_user),
@@ -29,7 +32,7 @@ def get_tasks(
     
     # إضافة pagination
     offset = (page - 1) * page_size
-    tasks = query.offset(offset).limit(page_size).all()
+    tasks = paginate(query, Task.id, page_size, cursor=cursor, offset=offset, response=response)
     
     return tasks
 
@@ -0,0 +1,133 @@
+"""
+قياس أداء إحصائيات لوحة المعلومات
+يقارن بين الطريقة القديمة (9 استعلامات COUNT) والاستعلام التجميعي والعدادات المخزنة
+
+الاستخدام (من مجلد backend):
+    python -m app.scripts.benchmark_dashboard_stats --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+import app.models  # noqa: F401 - تسجيل جميع النماذج
+import app.models.task  # noqa: F401
+from app.models.company import Company
+from app.models.document import Document
+from app.models.employee import Employee
+from app.models.license import License
+from app.services.dashboard_stats import (
+    compute_dashboard_stats,
+    read_dashboard_counters,
+    rebuild_dashboard_counters,
+)
+
+COMPANIES = 100
+EMPLOYEES = 5000
+BATCH_SIZE = 50000
+
+
+def legacy_dashboard_stats(db):
+    """نسخة من التنفيذ السابق للمقارنة: استعلام COUNT منفصل لكل رقم"""
+    return {
+        "total_companies": db.query(Company).count(),
+        "total_employees": db.query(Employee).count(),
+        "total_licenses": db.query(License).count(),
+        "total_documents": db.query(Document).count(),
+        "active_companies": db.query(Company).filter(Company.is_active == True).count(),
+        "active_employees": db.query(Employee).filter(Employee.is_active == True).count(),
+        "valid_licenses": db.query(License).filter(License.expiry_date > datetime.now()).count(),
+        "expired_licenses": db.query(License).filter(License.expiry_date <= datetime.now()).count(),
+        "expiring_soon": db.query(License).filter(
+            License.expiry_date > datetime.now(),
+            License.expiry_date <= datetime.now() + timedelta(days=30)
+        ).count(),
+    }
+
+
+def populate(engine, license_count: int):
+    """إنشاء بيانات تجريبية بالحجم المطلوب"""
+    rng = random.Random(42)
+    today = date.today()
+
+    with engine.begin() as conn:
+        conn.execute(insert(Company.__table__), [
+            {"name": f"شركة {i}", "is_active": i % 10 != 0} for i in range(COMPANIES)
+        ])
+        conn.execute(insert(Employee.__table__), [
+            {
+                "first_name": "موظف", "last_name": str(i), "full_name": f"موظف {i}",
+                "national_id": f"N{i}", "employee_number": f"E{i}", "position": "عامل",
+                "hire_date": today, "company_id": rng.randint(1, COMPANIES), "is_active": i % 7 != 0,
+            }
+            for i in range(EMPLOYEES)
+        ])
+
+        for start in range(0, license_count, BATCH_SIZE):
+            conn.execute(insert(License.__table__), [
+                {
+                    "name": "رخصة", "license_number": f"L{i}", "license_type": "TRADE",
+                    "issue_date": today - timedelta(days=365),
+                    "expiry_date": today + timedelta(days=rng.randint(-365, 730)),
+                    "company_id": rng.randint(1, COMPANIES),
+                }
+                for i in range(start, min(start + BATCH_SIZE, license_count))
+            ])
+
+
+def measure(func, db, repeat: int) -> float:
+    """الوسيط بالمللي ثانية"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(db)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(license_count: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        populate(engine, license_count)
+
+        db = sessionmaker(bind=engine)()
+        try:
+            rebuild_dashboard_counters(db)
+            assert compute_dashboard_stats(db) == read_dashboard_counters(db)
+
+            results = {
+                "legacy (9 COUNT)": measure(legacy_dashboard_stats, db, repeat),
+                "aggregated": measure(compute_dashboard_stats, db, repeat),
+                "counters": measure(read_dashboard_counters, db, repeat),
+            }
+        finally:
+            db.close()
+            engine.dispose()
+
+    print(f"\n{license_count:,} licenses")
+    baseline = results["legacy (9 COUNT)"]
+    for name, ms in results.items():
+        print(f"  {name:<18} {ms:10.2f} ms   x{baseline / ms:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard stats benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+قياس تكلفة طبقات الـ middleware لكل طلب
+يقارن بين تطبيق بدون middleware، والطبقات الخمس القديمة (BaseHTTPMiddleware)،
+والـ middleware الموحد RequestPipelineMiddleware
+
+الاستخدام (من مجلد backend):
+    python -m app.scripts.benchmark_middleware --requests 5000
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from app.core.middleware import ErrorHandlingMiddleware, RequestLoggingMiddleware
+from app.core.pipeline import RequestPipelineMiddleware
+from app.core.security_middleware import (
+    IPFilterMiddleware,
+    MemoryRateLimiter,
+    RateLimitMiddleware,
+    SecurityHeadersMiddleware,
+)
+
+# حد مرتفع حتى لا يرفض الـ rate limiter طلبات القياس
+CALLS = 10 ** 9
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"status": "ok"}
+
+    if stack == "legacy":
+        app.add_middleware(ErrorHandlingMiddleware)
+        app.add_middleware(RequestLoggingMiddleware)
+        app.add_middleware(RateLimitMiddleware, calls=CALLS, period=60)
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(IPFilterMiddleware)
+    elif stack == "pipeline":
+        app.add_middleware(RequestPipelineMiddleware, calls=CALLS, period=60, limiter=MemoryRateLimiter())
+    return app
+
+
+async def call(app, scope):
+    """طلب ASGI مباشر بدون خادم حتى يُقاس الـ middleware وحده"""
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app, requests: int, repeat: int) -> float:
+    """الوسيط بالميكرو ثانية لكل طلب"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/ping", "raw_path": b"/ping",
+        "root_path": "", "query_string": b"", "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+        "headers": [(b"host", b"testserver"), (b"user-agent", b"benchmark")],
+    }
+    for _ in range(100):
+        await call(app, dict(scope))
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(requests):
+            await call(app, dict(scope))
+        timings.append((time.perf_counter() - started) * 1_000_000 / requests)
+    return statistics.median(timings)
+
+
+async def run(requests: int, repeat: int):
+    results = {}
+    for stack in ("bare", "legacy", "pipeline"):
+        results[stack] = await measure(build_app(stack), requests, repeat)
+
+    baseline = results["bare"]
+    print(f"\n{requests:,} requests x {repeat}")
+    for name, us in results.items():
+        print(f"  {name:<10} {us:10.1f} us/request   overhead {us - baseline:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Middleware overhead benchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # سجل الطلبات يُكتب في كل الحالات، يُعطل حتى لا يطغى الـ I/O على القياس
+    logging.disable(logging.INFO)
+    asyncio.run(run(args.requests, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+قياس أداء التصفح بالـ OFFSET مقابل التصفح بالمؤشر (keyset)
+
+الاستخدام (من مجلد backend):
+    python -m app.scripts.benchmark_pagination --rows 100000 --pages 1 100 500 900
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.pagination import encode_cursor, paginate
+from app.database.base import Base
+import app.models  # noqa: F401 - تسجيل جميع النماذج
+import app.models.task  # noqa: F401
+from app.models.company import Company
+from app.models.employee import Employee
+
+BATCH_SIZE = 50000
+
+
+def populate(engine, rows: int):
+    today = date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(Company.__table__), [{"name": "شركة"}])
+        for start in range(0, rows, BATCH_SIZE):
+            conn.execute(insert(Employee.__table__), [
+                {
+                    "first_name": "موظف", "last_name": str(i), "full_name": f"موظف {i}",
+                    "national_id": f"N{i}", "employee_number": f"E{i}", "position": "عامل",
+                    "hire_date": today, "company_id": 1,
+                }
+                for i in range(start, min(start + BATCH_SIZE, rows))
+            ])
+
+
+def measure(func, repeat: int) -> float:
+    """الوسيط بالمللي ثانية"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offset vs keyset pagination benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 500, 900])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        populate(engine, args.rows)
+        db = sessionmaker(bind=engine)()
+
+        print(f"\n{args.rows:,} employees, page size {args.page_size}")
+        try:
+            for page in args.pages:
+                offset = (page - 1) * args.page_size
+                # المؤشر الذي كانت الصفحة السابقة ستعيده
+                cursor = encode_cursor({"id": offset}) if offset else None
+
+                offset_ms = measure(lambda: paginate(db.query(Employee), Employee.id, args.page_size, offset=offset), args.repeat)
+                keyset_ms = measure(lambda: paginate(db.query(Employee), Employee.id, args.page_size, cursor=cursor), args.repeat)
+                print(f"  page {page:<5} offset {offset_ms:8.2f} ms   cursor {keyset_ms:8.2f} ms")
+        finally:
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+قياس أداء SQLite تحت التزامن: محرك افتراضي مقابل المحرك المضبوط (WAL + busy_timeout)
+ينشئ قاعدة مؤقتة ويشغل N خيوط تنفذ قراءات وكتابات مختلطة عبر جلسات SQLAlchemy،
+ثم يطبع عدد العمليات في الثانية وعدد أخطاء "database is locked" لكل إعداد.
+
+الاستخدام (من مجلد backend):
+    python -m app.scripts.benchmark_sqlite_concurrency
+    python -m app.scripts.benchmark_sqlite_concurrency --threads 16 --seconds 10 --write-ratio 0.3
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import Column, Integer, String, create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.database.session import create_database_engine
+
+BenchBase = declarative_base()
+
+
+class Item(BenchBase):
+    __tablename__ = "bench_items"
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(Integer, index=True)
+    payload = Column(String(200))
+
+
+def default_engine(url: str):
+    """الإعداد السابق: بدون WAL وبدون انتظار للقفل"""
+    return create_engine(url, connect_args={"check_same_thread": False, "timeout": 0})
+
+
+def seed(engine, rows: int):
+    BenchBase.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all(Item(bucket=i % 100, payload="x" * 100) for i in range(rows))
+        db.commit()
+
+
+def worker(Session, deadline: float, write_ratio: float, stats: dict, lock: threading.Lock):
+    ops = errors = 0
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        try:
+            with Session() as db:
+                if rng.random() < write_ratio:
+                    db.add(Item(bucket=rng.randrange(100), payload="y" * 100))
+                    db.commit()
+                else:
+                    db.execute(
+                        select(func.count(), func.max(Item.id)).where(Item.bucket == rng.randrange(100))
+                    ).one()
+            ops += 1
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            errors += 1
+    with lock:
+        stats["ops"] += ops
+        stats["locked"] += errors
+
+
+def run(name: str, engine, threads: int, seconds: float, write_ratio: float) -> dict:
+    Session = sessionmaker(bind=engine)
+    stats = {"ops": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    workers = [
+        threading.Thread(target=worker, args=(Session, deadline, write_ratio, stats, lock))
+        for _ in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    engine.dispose()
+
+    print(f"{name:<8} {stats['ops'] / seconds:>10.0f} ops/s   {stats['locked']:>6} locked errors")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite concurrency benchmark: default vs tuned engine")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="نسبة عمليات الكتابة (0-1)")
+    parser.add_argument("--rows", type=int, default=10000, help="عدد الصفوف الأولية")
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:g}s, {args.write_ratio:.0%} writes\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, factory in (("default", default_engine), ("tuned", create_database_engine)):
+            url = f"sqlite:///{os.path.join(tmp, f'{name}.db')}"
+            engine = factory(url)
+            seed(engine, args.rows)
+            run(name, engine, args.threads, args.seconds, args.write_ratio)
+
+
+if __name__ == "__main__":
+    main()
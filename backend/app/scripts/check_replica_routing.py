@@ -0,0 +1,79 @@
+"""
+فحص توجيه نسخ القراءة محلياً بملفي SQLite (رئيسية ونسخة قراءة)
+القاعدتان غير متزامنتين عمداً (لا يوجد نسخ بينهما)، فيظهر من أي قاعدة قرأ كل طلب:
+
+1. GET يقرأ من نسخة القراءة
+2. PUT يكتب في القاعدة الرئيسية
+3. GET من نفس العميل خلال نافذة الثبات يقرأ من الرئيسية (يرى ما كتبه)
+4. عميل آخر يبقى على نسخة القراءة، وبعد انتهاء النافذة يعود العميل الأول إليها
+
+يخرج بالرمز 1 عند أي خطوة غير متوقعة.
+
+الاستخدام (من مجلد backend):
+    python -m app.scripts.check_replica_routing
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+STICKY_SECONDS = 1
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    primary_url = f"sqlite:///{os.path.join(tmp, 'primary.db')}"
+    replica_url = f"sqlite:///{os.path.join(tmp, 'replica.db')}"
+    # الإعدادات تُقرأ عند استيراد التطبيق
+    os.environ.update(
+        DATABASE_URL=primary_url,
+        DATABASE_REPLICA_URLS=f'["{replica_url}"]',
+        DATABASE_REPLICA_STICKY_SECONDS=str(STICKY_SECONDS),
+        CACHE_BACKEND="memory",
+    )
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import Session
+
+    from app.database.base import Base
+    from app.database.session import engine, replica_engines
+    import app.models  # noqa: F401 - تسجيل جميع النماذج
+    import app.models.task  # noqa: F401
+    from app.models.company import Company
+    from app.main import app
+
+    replica = replica_engines[0]
+    for db_engine, name in ((engine, "primary"), (replica, "replica")):
+        Base.metadata.create_all(db_engine)
+        with Session(db_engine) as db:
+            db.add(Company(id=1, name=name))
+            db.commit()
+
+    client = TestClient(app)
+    other = {"Authorization": "Bearer other-client"}
+
+    def company_name(headers=None) -> str:
+        return client.get("/api/companies/1", headers=headers).json()["name"]
+
+    steps = []
+    steps.append(("GET reads from replica", company_name(), "replica"))
+    client.put("/api/companies/1", json={"name": "primary-updated"})
+    steps.append(("GET after write reads primary", company_name(), "primary-updated"))
+    steps.append(("other client still reads replica", company_name(other), "replica"))
+    time.sleep(STICKY_SECONDS + 0.5)
+    steps.append(("GET after sticky window reads replica", company_name(), "replica"))
+
+    failures = 0
+    for name, got, expected in steps:
+        ok = got == expected
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name:<40} {got}")
+
+    engine.dispose()
+    replica.dispose()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+نقل ملفات الوثائق القديمة إلى مخزن الـ blobs (حسب SHA-256 المحتوى)
+لكل وثيقة بدون content_hash: يُحسب hash الملف، ويُنقل إلى uploaded_files/blobs/...
+إذا لم يكن المحتوى موجوداً، وإلا يُحذف الملف المكرر، ثم يُحدث file_path و content_hash.
+
+الاستخدام (من مجلد backend):
+    python -m app.scripts.migrate_document_blobs --dry-run
+    python -m app.scripts.migrate_document_blobs
+"""
+
+import argparse
+import os
+
+from app.database.session import SessionLocal
+import app.models  # noqa: F401 - تسجيل جميع النماذج
+import app.models.task  # noqa: F401
+from app.models.document import Document
+from app.services.file_storage import blob_path, file_sha256
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move legacy document files into the content-addressed blob store")
+    parser.add_argument("--dry-run", action="store_true", help="عرض النتيجة دون نقل أو تعديل")
+    args = parser.parse_args()
+
+    moved = duplicates = missing = saved_bytes = 0
+    db = SessionLocal()
+    try:
+        documents = db.query(Document).filter(Document.content_hash.is_(None)).order_by(Document.id).all()
+        # المسار القديم -> (مسار الـ blob، الـ hash)، لعدة وثائق تشير لنفس الملف
+        done = {}
+        seen = set()
+        for document in documents:
+            old_path = document.file_path
+            if old_path in done:
+                path, content_hash = done[old_path]
+            elif not old_path or not os.path.isfile(old_path):
+                missing += 1
+                continue
+            else:
+                content_hash = file_sha256(old_path)
+                path = blob_path(content_hash)
+                if old_path == path:
+                    pass
+                elif content_hash in seen or os.path.exists(path):
+                    duplicates += 1
+                    saved_bytes += os.path.getsize(old_path)
+                    if not args.dry_run:
+                        os.remove(old_path)
+                else:
+                    moved += 1
+                    if not args.dry_run:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        os.replace(old_path, path)
+                seen.add(content_hash)
+                done[old_path] = (path, content_hash)
+
+            if not args.dry_run:
+                document.file_path = path
+                document.content_hash = content_hash
+                db.commit()
+    finally:
+        db.close()
+
+    print(f"moved: {moved}, duplicates removed: {duplicates} ({saved_bytes / (1024 * 1024):.1f} MB), missing files: {missing}")
+    if args.dry_run:
+        print("dry run: no files or rows were changed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+فهرس الإكمال التلقائي في الذاكرة للبحث الموحد
+- مصفوفة مرتبة من (المفتاح الموحد، النوع، المعرف) والبحث عن البادئة بـ bisect
+- المفاتيح: أسماء الموظفين وأرقام هوياتهم، أرقام الرخص، أسماء الشركات
+  (الاسم يُفهرس من بداية كل كلمة فيه حتى تطابق "علي" الاسم "أحمد علي")
+- يُبنى عند بدء التطبيق ويُحدث بعد كل commit من أحداث الـ Session
+
+الفهرس خاص بكل عملية (process): التعديلات من عملية أخرى تظهر بعد إعادة البناء،
+وما لا يغطيه الفهرس يُبحث عنه في قاعدة البيانات (search_index).
+"""
+
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import threading
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.database.session import SessionLocal
+from app.utils.arabic import normalize_arabic, search_tokens
+
+logger = logging.getLogger(__name__)
+
+# الجدول -> (نوع النتيجة، حقل العنوان، الحقول المفهرسة)
+SOURCES: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "employees": ("employee", "full_name", ("full_name", "national_id")),
+    "licenses": ("license", "license_number", ("license_number",)),
+    "companies": ("company", "name", ("name",)),
+}
+
+# عدد المرشحين الذين يُقرؤون من نطاق البادئة قبل الترتيب
+MAX_CANDIDATES = 200
+
+Entity = Tuple[str, int]
+
+
+def _keys(values: Iterable) -> Set[str]:
+    """مفاتيح الكيان: النص الموحد من بداية كل كلمة"""
+    keys = set()
+    for value in values:
+        tokens = search_tokens(value)
+        for i in range(len(tokens)):
+            keys.add(" ".join(tokens[i:]))
+    return keys
+
+
+class PrefixIndex:
+    """فهرس بادئات على مصفوفة مرتبة"""
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str, int]] = []
+        self._labels: Dict[Entity, str] = {}
+        self._entity_keys: Dict[Entity, Set[str]] = {}
+        self._lock = threading.Lock()
+        # يزيد مع كل تعديل، حتى تعرف replace_type إذا تغير الفهرس أثناء البناء خارج القفل
+        self._version = 0
+        self.ready = False
+
+    def __len__(self):
+        return len(self._labels)
+
+    def load(self, rows: Iterable[Tuple[str, int, str, Iterable]]):
+        """استبدال الفهرس بالكامل: (النوع، المعرف، العنوان، القيم المفهرسة)"""
+        entries, labels, entity_keys = [], {}, {}
+        for entity_type, entity_id, label, values in rows:
+            keys = _keys(values)
+            labels[(entity_type, entity_id)] = label
+            entity_keys[(entity_type, entity_id)] = keys
+            entries.extend((key, entity_type, entity_id) for key in keys)
+        entries.sort()
+        with self._lock:
+            self._entries, self._labels, self._entity_keys = entries, labels, entity_keys
+            self._version += 1
+            self.ready = True
+
+    def replace_type(self, entity_type: str, rows: Iterable[Tuple[int, str, Iterable]]):
+        """إعادة بناء نوع واحد (بعد التعديلات الجماعية)
+
+        التقطيع والترتيب يتمان خارج القفل مثل load، ولا يُحجز القفل إلا لنسخ الفهرس
+        الحالي واستبداله، فلا يتوقف البحث أثناء إعادة البناء.
+        """
+        new_entries, new_labels, new_keys = [], {}, {}
+        for entity_id, label, values in rows:
+            keys = _keys(values)
+            new_labels[(entity_type, entity_id)] = label
+            new_keys[(entity_type, entity_id)] = keys
+            new_entries.extend((key, entity_type, entity_id) for key in keys)
+        new_entries.sort()
+
+        while True:
+            with self._lock:
+                version = self._version
+                entries, labels, entity_keys = list(self._entries), dict(self._labels), dict(self._entity_keys)
+
+            entries = list(merge((entry for entry in entries if entry[1] != entity_type), new_entries))
+            labels = {entity: label for entity, label in labels.items() if entity[0] != entity_type}
+            labels.update(new_labels)
+            entity_keys = {entity: keys for entity, keys in entity_keys.items() if entity[0] != entity_type}
+            entity_keys.update(new_keys)
+
+            with self._lock:
+                # تعديل من commit آخر أثناء البناء: نعيد الدمج على النسخة الأحدث
+                if self._version == version:
+                    self._entries, self._labels, self._entity_keys = entries, labels, entity_keys
+                    self._version += 1
+                    return
+
+    def upsert(self, entity_type: str, entity_id: int, label: str, values: Iterable):
+        with self._lock:
+            self._remove((entity_type, entity_id))
+            self._version += 1
+            keys = _keys(values)
+            self._labels[(entity_type, entity_id)] = label
+            self._entity_keys[(entity_type, entity_id)] = keys
+            for key in keys:
+                insort(self._entries, (key, entity_type, entity_id))
+
+    def remove(self, entity_type: str, entity_id: int):
+        with self._lock:
+            self._remove((entity_type, entity_id))
+            self._version += 1
+
+    def _remove(self, entity: Entity):
+        self._labels.pop(entity, None)
+        for key in self._entity_keys.pop(entity, ()):
+            entry = (key, *entity)
+            position = bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def search(self, query: str, limit: int = 10, types: Optional[Set[str]] = None) -> List[dict]:
+        """أفضل limit نتيجة تبدأ مفاتيحها بنص البحث
+
+        التطابق التام أولاً، ثم المطابقة من بداية العنوان، ثم العناوين الأقصر.
+        """
+        prefix = " ".join(search_tokens(query))
+        if not prefix:
+            return []
+
+        with self._lock:
+            position = bisect_left(self._entries, (prefix,))
+            candidates: Dict[Entity, Tuple] = {}
+            scanned = 0
+            while position < len(self._entries) and scanned < MAX_CANDIDATES:
+                key, entity_type, entity_id = self._entries[position]
+                if not key.startswith(prefix):
+                    break
+                position += 1
+                scanned += 1
+                if types and entity_type not in types:
+                    continue
+                entity = (entity_type, entity_id)
+                label = self._labels[entity]
+                rank = (key != prefix, not normalize_arabic(label).startswith(prefix), len(label))
+                if entity not in candidates or rank < candidates[entity]:
+                    candidates[entity] = rank
+
+            best = sorted(candidates.items(), key=lambda item: item[1])[:limit]
+            return [
+                {"type": entity_type, "id": entity_id, "label": self._labels[(entity_type, entity_id)]}
+                for (entity_type, entity_id), _ in best
+            ]
+
+
+autocomplete_index = PrefixIndex()
+
+
+def _rows(db: Session, tablename: str):
+    from app.database.base import Base
+
+    _, label_field, fields = SOURCES[tablename]
+    table = Base.metadata.tables[tablename]
+    columns = [table.c.id] + [table.c[field] for field in dict.fromkeys((label_field,) + fields)]
+    for row in db.execute(table.select().with_only_columns(*columns)):
+        values = row._mapping
+        yield values["id"], values[label_field], [values[field] for field in fields]
+
+
+def build_autocomplete_index(db: Session):
+    """بناء الفهرس بالكامل من قاعدة البيانات"""
+    autocomplete_index.load(
+        (SOURCES[tablename][0], entity_id, label, values)
+        for tablename in SOURCES
+        for entity_id, label, values in _rows(db, tablename)
+    )
+    logger.info(f"Autocomplete index built ({len(autocomplete_index)} entries)")
+
+
+# ---------------------------------------------------------------------------
+# التحديث من أحداث الـ Session (بعد الـ commit فقط)
+# ---------------------------------------------------------------------------
+
+_PENDING_KEY = "autocomplete_pending"
+_RELOAD_KEY = "autocomplete_reload"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session: Session, flush_context):
+    pending = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tablename = getattr(obj, "__tablename__", None)
+        if tablename not in SOURCES:
+            continue
+        entity_type, label_field, fields = SOURCES[tablename]
+        if pending is None:
+            pending = session.info.setdefault(_PENDING_KEY, {})
+        if obj in session.deleted:
+            pending[(entity_type, obj.id)] = None
+            continue
+        state = inspect(obj)
+        watched = dict.fromkeys((label_field,) + fields)
+        if obj not in session.new and not any(state.attrs[field].history.has_changes() for field in watched):
+            continue
+        pending[(entity_type, obj.id)] = (getattr(obj, label_field), [getattr(obj, field) for field in fields])
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _detect_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    tablename = getattr(mapper.class_, "__tablename__", None) if mapper is not None else None
+    if tablename not in SOURCES:
+        return
+
+    if orm_execute_state.is_update:
+        # تحديث أعمدة غير مفهرسة (مثل status في فحص انتهاء الرخص) لا يحتاج إعادة تحميل
+        _, label_field, fields = SOURCES[tablename]
+        values = getattr(orm_execute_state.statement, "_values", None) or {}
+        updated = {getattr(column, "key", column) for column in values}
+        if values and not updated.intersection((label_field,) + fields):
+            return
+
+    orm_execute_state.session.info.setdefault(_RELOAD_KEY, set()).add(tablename)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    tables = session.info.pop(_RELOAD_KEY, None)
+    if not autocomplete_index.ready:
+        return
+
+    for (entity_type, entity_id), change in (pending or {}).items():
+        if change is None:
+            autocomplete_index.remove(entity_type, entity_id)
+        else:
+            autocomplete_index.upsert(entity_type, entity_id, *change)
+
+    if tables:
+        # SessionLocal وليس bind الجلسة الحالية: مع نسخ القراءة قد يكون bind الجلسة نسخة قراءة
+        db = SessionLocal()
+        try:
+            for tablename in tables:
+                autocomplete_index.replace_type(SOURCES[tablename][0], list(_rows(db, tablename)))
+        except Exception as e:
+            logger.error(f"Autocomplete index reload error: {e}")
+        finally:
+            db.close()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_RELOAD_KEY, None)
@@ -0,0 +1,340 @@
+"""
+إحصائيات لوحة المعلومات
+- استعلام تجميعي واحد لكل جدول بدلاً من استعلام COUNT منفصل لكل رقم
+- عدادات مخزنة اختيارية (DASHBOARD_COUNTERS_ENABLED) تُحدث تدريجياً مع كل
+  تعديل، فتصبح تكلفة لوحة المعلومات ثابتة مهما كان حجم الجداول
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Iterable, Tuple
+import logging
+import threading
+
+from sqlalchemy import and_, case, delete, event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache, cache_statistics
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.models.company import Company
+from app.models.dashboard_counter import DashboardCounter
+from app.models.document import Document
+from app.models.employee import Employee
+from app.models.license import License
+
+logger = logging.getLogger(__name__)
+
+# عدد الأيام التي تعتبر فيها الرخصة "ستنتهي قريباً"
+EXPIRING_SOON_DAYS = 30
+
+# الرخصة صالحة حتى نهاية يوم انتهائها، وتُحسب منتهية من اليوم التالي
+# (نفس الحد في app.services.license_expiry: expiry_date < today)
+
+# فئة واحدة تجمع كل تواريخ الانتهاء الماضية عند إعادة بناء العدادات
+PAST_BUCKET = "0000-00-00"
+
+
+def compute_dashboard_stats(db: Session) -> Dict[str, int]:
+    """حساب الإحصائيات مباشرة من الجداول باستعلام تجميعي واحد لكل جدول"""
+    today = date.today()
+    soon = today + timedelta(days=EXPIRING_SOON_DAYS)
+
+    total_companies, active_companies = db.query(
+        func.count(Company.id),
+        func.count(case((Company.is_active == True, 1))),
+    ).one()
+
+    total_employees, active_employees = db.query(
+        func.count(Employee.id),
+        func.count(case((Employee.is_active == True, 1))),
+    ).one()
+
+    total_licenses, valid_licenses, expired_licenses, expiring_soon = db.query(
+        func.count(License.id),
+        func.count(case((License.expiry_date >= today, 1))),
+        func.count(case((License.expiry_date < today, 1))),
+        func.count(case((and_(License.expiry_date >= today, License.expiry_date <= soon), 1))),
+    ).one()
+
+    total_documents = db.query(func.count(Document.id)).scalar()
+
+    return {
+        "total_companies": total_companies,
+        "active_companies": active_companies,
+        "total_employees": total_employees,
+        "active_employees": active_employees,
+        "total_licenses": total_licenses,
+        "valid_licenses": valid_licenses,
+        "expired_licenses": expired_licenses,
+        "expiring_soon": expiring_soon,
+        "total_documents": total_documents,
+    }
+
+
+def read_dashboard_counters(db: Session) -> Dict[str, int]:
+    """قراءة الإحصائيات من جدول العدادات باستعلام واحد"""
+    today = date.today().isoformat()
+    soon = (date.today() + timedelta(days=EXPIRING_SOON_DAYS)).isoformat()
+    name, bucket, value = DashboardCounter.name, DashboardCounter.bucket, DashboardCounter.value
+    is_expiry = name == "licenses.expiry"
+
+    columns = {
+        "total_companies": name == "companies.total",
+        "active_companies": name == "companies.active",
+        "total_employees": name == "employees.total",
+        "active_employees": name == "employees.active",
+        "total_licenses": name == "licenses.total",
+        "valid_licenses": and_(is_expiry, bucket >= today),
+        "expired_licenses": and_(is_expiry, bucket < today),
+        "expiring_soon": and_(is_expiry, bucket >= today, bucket <= soon),
+        "total_documents": name == "documents.total",
+    }
+    row = db.query(
+        *[func.coalesce(func.sum(case((condition, value), else_=0)), 0) for condition in columns.values()]
+    ).one()
+    return {key: int(total) for key, total in zip(columns, row)}
+
+
+@cache_statistics()
+def get_dashboard_stats() -> Dict[str, int]:
+    """الإحصائيات المعروضة في لوحة المعلومات (مع cache يُبطل عند أي تعديل)"""
+    db = SessionLocal()
+    try:
+        if settings.DASHBOARD_COUNTERS_ENABLED:
+            return read_dashboard_counters(db)
+        return compute_dashboard_stats(db)
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# تحديث العدادات تدريجياً
+# ---------------------------------------------------------------------------
+
+def _company_counters(values) -> Iterable[Tuple[str, str]]:
+    yield ("companies.total", "")
+    if values["is_active"]:
+        yield ("companies.active", "")
+
+
+def _employee_counters(values) -> Iterable[Tuple[str, str]]:
+    yield ("employees.total", "")
+    if values["is_active"]:
+        yield ("employees.active", "")
+
+
+def _license_counters(values) -> Iterable[Tuple[str, str]]:
+    yield ("licenses.total", "")
+    if values["expiry_date"] is not None:
+        yield ("licenses.expiry", values["expiry_date"].isoformat())
+
+
+def _document_counters(values) -> Iterable[Tuple[str, str]]:
+    yield ("documents.total", "")
+
+
+# الجدول -> (الأعمدة المؤثرة على العدادات، دالة العدادات التي يساهم فيها الصف)
+TRACKED_TABLES = {
+    "companies": (("is_active",), _company_counters),
+    "employees": (("is_active",), _employee_counters),
+    "licenses": (("expiry_date",), _license_counters),
+    "documents": ((), _document_counters),
+}
+
+# تحميل القيمة السابقة عند تعديل عمود متابع حتى لو كانت منتهية (expired) بعد commit
+for _model in (Company, Employee, License):
+    for _field in TRACKED_TABLES[_model.__tablename__][0]:
+        event.listen(getattr(_model, _field), "set", lambda target, value, oldvalue, initiator: None, active_history=True)
+
+_DELTAS_KEY = "dashboard_counter_deltas"
+_REBUILD_KEY = "dashboard_counters_rebuild"
+
+
+def _current_values(obj, fields) -> Dict:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def _previous_values(obj, fields) -> Dict:
+    values = {}
+    for field in fields:
+        history = inspect(obj).attrs[field].history
+        values[field] = history.deleted[0] if history.deleted else getattr(obj, field)
+    return values
+
+
+def _add(deltas: Counter, counters: Iterable[Tuple[str, str]], sign: int):
+    for key in counters:
+        deltas[key] += sign
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_deleted(session: Session, flush_context, instances):
+    """الصفوف المحذوفة تُقرأ قبل الحذف حتى تكون قيمها متاحة"""
+    if not settings.DASHBOARD_COUNTERS_ENABLED:
+        return
+    for obj in session.deleted:
+        tracked = TRACKED_TABLES.get(getattr(obj, "__tablename__", None))
+        if tracked is None:
+            continue
+        fields, counters = tracked
+        deltas = session.info.setdefault(_DELTAS_KEY, Counter())
+        _add(deltas, counters(_current_values(obj, fields)), -1)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_flushed(session: Session, flush_context):
+    """تطبيق فروق العدادات داخل نفس الـ transaction الخاصة بالتعديل"""
+    if not settings.DASHBOARD_COUNTERS_ENABLED:
+        return
+    deltas = session.info.pop(_DELTAS_KEY, None) or Counter()
+
+    for obj in session.new:
+        tracked = TRACKED_TABLES.get(getattr(obj, "__tablename__", None))
+        if tracked is not None:
+            fields, counters = tracked
+            _add(deltas, counters(_current_values(obj, fields)), 1)
+
+    for obj in session.dirty:
+        tracked = TRACKED_TABLES.get(getattr(obj, "__tablename__", None))
+        if tracked is None or obj in session.deleted:
+            continue
+        fields, counters = tracked
+        if not any(inspect(obj).attrs[field].history.has_changes() for field in fields):
+            continue
+        _add(deltas, counters(_previous_values(obj, fields)), -1)
+        _add(deltas, counters(_current_values(obj, fields)), 1)
+
+    if deltas:
+        apply_counter_deltas(session.connection(), deltas)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _detect_bulk_changes(orm_execute_state):
+    """التعديل الجماعي لا يمر عبر flush، لذلك يُعاد بناء العدادات بعد الـ commit"""
+    if not settings.DASHBOARD_COUNTERS_ENABLED:
+        return
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    tracked = TRACKED_TABLES.get(getattr(mapper.class_, "__tablename__", None)) if mapper is not None else None
+    if tracked is None:
+        return
+
+    if orm_execute_state.is_update:
+        # تحديث أعمدة لا تؤثر على العدادات (مثل status) لا يحتاج إعادة بناء
+        values = getattr(orm_execute_state.statement, "_values", None) or {}
+        updated = {getattr(column, "key", column) for column in values}
+        if values and not updated.intersection(tracked[0]):
+            return
+
+    orm_execute_state.session.info[_REBUILD_KEY] = True
+
+
+# إعادة البناء بعد التعديل الجماعي تعمل خارج الطلب في thread واحد، والطلبات المتتالية
+# أثناء انتظارها تُدمج في إعادة بناء واحدة
+_rebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dashboard-rebuild")
+_rebuild_lock = threading.Lock()
+_rebuild_queued = False
+
+
+def _run_rebuild():
+    global _rebuild_queued
+    with _rebuild_lock:
+        _rebuild_queued = False
+    # SessionLocal وليس bind جلسة الطلب: الكتابة يجب أن تذهب للقاعدة الرئيسية دائماً
+    db = SessionLocal()
+    try:
+        rebuild_dashboard_counters(db)
+    except Exception as e:
+        logger.error(f"Dashboard counters rebuild error: {e}")
+    finally:
+        db.close()
+
+
+def schedule_dashboard_rebuild():
+    """جدولة إعادة بناء العدادات في الخلفية (مرة واحدة مهما تكرر الطلب قبل بدئها)"""
+    global _rebuild_queued
+    with _rebuild_lock:
+        if _rebuild_queued:
+            return
+        _rebuild_queued = True
+    _rebuild_executor.submit(_run_rebuild)
+
+
+@event.listens_for(Session, "after_commit")
+def _rebuild_after_bulk(session: Session):
+    if session.info.pop(_REBUILD_KEY, False):
+        schedule_dashboard_rebuild()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deltas(session: Session):
+    session.info.pop(_DELTAS_KEY, None)
+    session.info.pop(_REBUILD_KEY, None)
+
+
+def apply_counter_deltas(connection, deltas: Dict[Tuple[str, str], int]):
+    """إضافة الفروق إلى العدادات (upsert) باستخدام اتصال الـ transaction الحالية"""
+    table = DashboardCounter.__table__
+    rows = [
+        {"name": name, "bucket": bucket, "value": delta}
+        for (name, bucket), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name, table.c.bucket],
+            set_={"value": table.c.value + stmt.excluded.value, "updated_at": func.now()},
+        )
+        connection.execute(stmt, rows)
+        return
+
+    for row in rows:
+        result = connection.execute(
+            table.update()
+            .where(table.c.name == row["name"], table.c.bucket == row["bucket"])
+            .values(value=table.c.value + row["value"], updated_at=func.now())
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def rebuild_dashboard_counters(db: Session):
+    """إعادة بناء جميع العدادات من الجداول (عند التفعيل أو بعد تعديل جماعي)"""
+    today = date.today()
+    counters: Counter = Counter()
+
+    stats = compute_dashboard_stats(db)
+    counters[("companies.total", "")] = stats["total_companies"]
+    counters[("companies.active", "")] = stats["active_companies"]
+    counters[("employees.total", "")] = stats["total_employees"]
+    counters[("employees.active", "")] = stats["active_employees"]
+    counters[("licenses.total", "")] = stats["total_licenses"]
+    counters[("documents.total", "")] = stats["total_documents"]
+
+    expiry_rows = db.query(License.expiry_date, func.count(License.id)).filter(
+        License.expiry_date.isnot(None)
+    ).group_by(License.expiry_date).all()
+    for expiry_date, count in expiry_rows:
+        # التواريخ الماضية تُجمع في فئة واحدة لأنها تُحسب دائماً كرخص منتهية
+        bucket = PAST_BUCKET if expiry_date < today else expiry_date.isoformat()
+        counters[("licenses.expiry", bucket)] += count
+
+    db.execute(delete(DashboardCounter))
+    db.add_all([
+        DashboardCounter(name=name, bucket=bucket, value=value)
+        for (name, bucket), value in counters.items()
+    ])
+    db.commit()
+    cache.invalidate_tags("stats:*")
+    logger.info(f"Dashboard counters rebuilt ({len(counters)} rows)")
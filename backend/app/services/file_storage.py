@@ -0,0 +1,204 @@
+"""
+حفظ الملفات المرفوعة في مخزن بحسب المحتوى (content-addressed)
+يُقرأ الملف المرفوع على دفعات ويُكتب عبر aiofiles (في خيط منفصل) فلا تتوقف حلقة
+الأحداث أثناء الكتابة، مع حساب SHA-256 وحجم الملف أثناء القراءة نفسها.
+
+كل محتوى يُحفظ مرة واحدة في uploaded_files/blobs/ab/cd/<sha256>، فرفع نفس الملف
+مرة أخرى (نفس صورة الإقامة أو الجواز) يضيف سجل Document فقط دون نسخة جديدة.
+عدد الإشارات هو عدد سجلات Document بنفس content_hash، ويُحذف الـ blob عند حذف آخر
+وثيقة تشير إليه.
+
+الكتابة تتم في ملف مؤقت داخل مجلد الـ blobs ثم link إلى المسار النهائي، فلا يظهر
+ملف ناقص أبداً، ويُحذف الملف المؤقت عند تجاوز الحد أو أي خطأ.
+
+الرفع والحذف المتزامنان لنفس المحتوى: الحذف قد يعد الإشارات قبل حفظ سجل الرفع
+الجديد ثم يحذف الـ blob الذي يعتمد عليه. لذلك يبقى الملف المؤقت حتى حفظ السجل
+(ensure_blob يعيد الـ blob منه إذا اختفى)، و release_blob ينقل الـ blob جانباً ثم
+يعيد العد قبل الحذف النهائي ويعيده إذا ظهرت إشارة جديدة. يعمل هذا بين العمليات
+(workers) أيضاً لأنه يعتمد على قاعدة البيانات ونظام الملفات فقط.
+"""
+
+from typing import Optional
+import glob
+import hashlib
+import logging
+import os
+import uuid
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document import Document
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+BLOB_DIR = os.path.join(settings.UPLOAD_FOLDER, "blobs")
+
+
+class StoredFile:
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        sha256: str,
+        duplicate: bool = False,
+        temp_path: Optional[str] = None,
+    ):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        # المحتوى كان موجوداً مسبقاً في المخزن
+        self.duplicate = duplicate
+        # نسخة من المحتوى تبقى حتى حفظ سجل الوثيقة (ensure_blob / discard_upload)
+        self.temp_path = temp_path
+
+
+def file_extension(filename: Optional[str]) -> str:
+    return os.path.splitext(filename or "")[1].lower().lstrip(".")
+
+
+def check_extension(filename: Optional[str]) -> str:
+    """التحقق من امتداد الملف قبل قراءة محتواه"""
+    extension = file_extension(filename)
+    if extension not in settings.ALLOWED_EXTENSIONS:
+        allowed = ", ".join(sorted(settings.ALLOWED_EXTENSIONS))
+        raise HTTPException(status_code=400, detail=f"نوع الملف غير مسموح (المسموح: {allowed})")
+    return extension
+
+
+def blob_path(content_hash: str) -> str:
+    """مسار الـ blob: مستويان من أول أحرف الـ hash حتى لا يكبر مجلد واحد"""
+    return os.path.join(BLOB_DIR, content_hash[:2], content_hash[2:4], content_hash)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _stream_to_temp(upload: UploadFile, directory: str, max_size: int) -> StoredFile:
+    """نسخ الملف المرفوع إلى ملف مؤقت على دفعات، مع إيقاف الكتابة فور تجاوز الحد (413)"""
+    await aiofiles.os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"حجم الملف يتجاوز الحد المسموح ({round(max_size / (1024 * 1024), 1):g} ميجابايت)",
+                    )
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        await _remove_quietly(temp_path)
+        raise
+
+    return StoredFile(temp_path, size, digest.hexdigest())
+
+
+async def store_upload(upload: UploadFile, max_size: Optional[int] = None) -> StoredFile:
+    """حفظ الملف المرفوع في مخزن الـ blobs حسب SHA-256 محتواه
+
+    يجب استدعاء ensure_blob بعد حفظ سجل الوثيقة، أو discard_upload عند فشل الحفظ.
+    """
+    max_size = settings.MAX_FILE_SIZE if max_size is None else max_size
+    temp = await _stream_to_temp(upload, BLOB_DIR, max_size)
+    path = blob_path(temp.sha256)
+
+    duplicate = True
+    try:
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        # link ذري ويفشل إذا كان المحتوى موجوداً، والملف المؤقت يبقى حتى حفظ السجل
+        await aiofiles.os.link(temp.path, path)
+        duplicate = False
+    except FileExistsError:
+        pass
+    except BaseException:
+        await _remove_quietly(temp.path)
+        raise
+    return StoredFile(path, temp.size, temp.sha256, duplicate=duplicate, temp_path=temp.path)
+
+
+async def ensure_blob(stored: StoredFile):
+    """بعد حفظ سجل الوثيقة: إعادة الـ blob إذا حذفه release_blob متزامن، ثم حذف الملف المؤقت"""
+    temp_path, stored.temp_path = stored.temp_path, None
+    if temp_path is None:
+        return
+    if await aiofiles.os.path.exists(stored.path):
+        await _remove_quietly(temp_path)
+        return
+
+    logger.warning(f"Blob {stored.sha256[:12]} was released during upload, restoring it")
+    await aiofiles.os.makedirs(os.path.dirname(stored.path), exist_ok=True)
+    await aiofiles.os.replace(temp_path, stored.path)
+
+
+async def discard_upload(stored: StoredFile):
+    """حذف الملف المؤقت عند فشل حفظ سجل الوثيقة"""
+    temp_path, stored.temp_path = stored.temp_path, None
+    if temp_path is not None:
+        await _remove_quietly(temp_path)
+
+
+async def _remove_quietly(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def blob_references(db: Session, content_hash: str) -> int:
+    """عدد الوثائق التي تشير إلى نفس المحتوى"""
+    return db.query(func.count(Document.id)).filter(Document.content_hash == content_hash).scalar()
+
+
+def release_blob(db: Session, content_hash: str) -> bool:
+    """حذف الـ blob ومشتقاته (المعاينات) إذا لم تعد أي وثيقة تشير إليه
+
+    يُستدعى بعد حفظ حذف السجل (commit) حتى لا يُحسب السجل المحذوف. الـ blob يُنقل
+    جانباً أولاً ثم يُعاد العد: إذا حُفظت وثيقة بنفس المحتوى بين العدين يُعاد الـ blob
+    مكانه، وإذا حُفظت بعد النقل يعيده ensure_blob في طلب الرفع.
+    """
+    if blob_references(db, content_hash):
+        return False
+
+    path = blob_path(content_hash)
+    released = f"{path}.{uuid.uuid4().hex}.released"
+    try:
+        os.replace(path, released)
+    except FileNotFoundError:
+        released = None
+
+    # إنهاء الـ transaction الحالية حتى يرى العد الثاني ما حُفظ بعد العد الأول
+    db.rollback()
+    if blob_references(db, content_hash):
+        if released is not None:
+            os.replace(released, path)
+        return False
+
+    for file_path in glob.glob(f"{glob.escape(path)}.*"):
+        if file_path.endswith(".released") and file_path != released:
+            # blob منقول بواسطة release_blob آخر يعمل الآن
+            continue
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+    return True
@@ -0,0 +1,123 @@
+"""
+فحص انتهاء صلاحية الرخص
+- تحويل الرخص المنتهية إلى expired بعملية UPDATE واحدة
+- حساب مستوى الإشعار (info / warning / expired) داخل SQL باستخدام CASE
+- استبعاد الرخص التي أُرسل لها نفس المستوى سابقاً (جدول license_expiry_notices)
+- إرسال الإشعارات على دفعات
+
+تعمل بشكل متزامن بالكامل لذلك تُشغل من المهام الخلفية في thread منفصل.
+"""
+
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List
+import logging
+
+from sqlalchemy import and_, case, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database.session import SessionLocal
+from app.models.employee import Employee
+from app.models.license import License, LicenseStatus
+from app.models.license_expiry_notice import LicenseExpiryNotice
+from app.services.notification_events import publish_license_expiry_batch
+
+logger = logging.getLogger(__name__)
+
+# مستويات الإشعار بعدد الأيام المتبقية
+INFO_DAYS = 30
+WARNING_DAYS = 7
+
+# الرخص التي انتهت قبل هذه المدة لا يُرسل لها إشعار (مثلاً عند أول تشغيل)
+EXPIRED_LOOKBACK_DAYS = 30
+
+BATCH_SIZE = 500
+
+
+def expire_licenses(db: Session, today: date) -> int:
+    """تحويل الرخص النشطة التي انتهى تاريخها إلى expired بعملية واحدة"""
+    result = db.execute(
+        update(License)
+        .where(License.status == LicenseStatus.ACTIVE, License.expiry_date < today)
+        .values(status=LicenseStatus.EXPIRED)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def tier_expression(today: date):
+    return case(
+        (License.expiry_date < today, "expired"),
+        (License.expiry_date <= today + timedelta(days=WARNING_DAYS), "warning"),
+        else_="info",
+    )
+
+
+def pending_notices(db: Session, today: date, limit: int = BATCH_SIZE) -> List:
+    """الرخص التي وصلت لمستوى إشعار لم يُرسل بعد لنفس تاريخ الانتهاء"""
+    tier = tier_expression(today)
+    return db.query(
+        License.id,
+        License.name,
+        License.license_number,
+        License.expiry_date,
+        License.company_id,
+        License.employee_id,
+        Employee.company_id.label("employee_company_id"),
+        Employee.user_id,
+        tier.label("tier"),
+    ).outerjoin(
+        Employee, Employee.id == License.employee_id
+    ).outerjoin(
+        LicenseExpiryNotice,
+        and_(
+            LicenseExpiryNotice.license_id == License.id,
+            LicenseExpiryNotice.tier == tier,
+            LicenseExpiryNotice.expiry_date == License.expiry_date,
+        ),
+    ).filter(
+        or_(
+            and_(License.status == LicenseStatus.ACTIVE, License.expiry_date >= today),
+            and_(License.status == LicenseStatus.EXPIRED, License.expiry_date < today),
+        ),
+        License.expiry_date >= today - timedelta(days=EXPIRED_LOOKBACK_DAYS),
+        License.expiry_date <= today + timedelta(days=INFO_DAYS),
+        LicenseExpiryNotice.license_id.is_(None),
+    ).order_by(License.expiry_date, License.id).limit(limit).all()
+
+
+def scan_license_expiry(batch_size: int = BATCH_SIZE) -> Dict:
+    """فحص واحد كامل: تحديث الرخص المنتهية ثم إرسال الإشعارات الجديدة"""
+    db = SessionLocal()
+    try:
+        today = date.today()
+        expired_count = expire_licenses(db, today)
+        db.commit()
+
+        sent: Counter = Counter()
+        while True:
+            rows = pending_notices(db, today, batch_size)
+            if not rows:
+                break
+
+            try:
+                db.execute(insert(LicenseExpiryNotice), [
+                    {"license_id": row.id, "tier": row.tier, "expiry_date": row.expiry_date}
+                    for row in rows
+                ])
+                db.commit()
+            except IntegrityError:
+                # عملية أخرى سجلت نفس الإشعارات في نفس الوقت وستتولى إرسالها
+                db.rollback()
+                logger.info("License expiry notices already recorded by another worker")
+                break
+
+            publish_license_expiry_batch(rows, today)
+            sent.update(row.tier for row in rows)
+
+        if expired_count or sent:
+            logger.info(f"License expiry scan: {expired_count} expired, notices sent {dict(sent)}")
+        return {"licenses_expired": expired_count, "notices": dict(sent)}
+    finally:
+        db.close()
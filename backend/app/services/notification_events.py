@@ -0,0 +1,108 @@
+"""
+أحداث الإشعارات الفورية
+تُرسل للمستخدمين المعنيين عبر مركز الإشعارات بدلاً من أن تستعلم الواجهة بشكل دوري
+
+أنواع الأحداث:
+- alert.created: تنبيه جديد
+- count.changed: تغير عدد التنبيهات غير المقروءة
+- license.expiring: رخص ستنتهي قريباً (level: info أو warning)
+- license.expired: رخص انتهت صلاحيتها
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.core.notifications import (
+    BROADCAST_CHANNEL,
+    company_channel,
+    notification_hub,
+    user_channel,
+)
+from app.models.alert import Alert
+
+logger = logging.getLogger(__name__)
+
+
+def _value(value):
+    return getattr(value, "value", value)
+
+
+def publish_event(event_type: str, data: dict, channels: Iterable[str]):
+    """إرسال حدث بالصيغة الموحدة: {type, data, timestamp}"""
+    channels = list(dict.fromkeys(channels))
+    if not channels:
+        return
+    event = {"type": event_type, "data": data, "timestamp": datetime.now().isoformat()}
+    try:
+        notification_hub.publish_nowait(channels, event)
+    except Exception as e:
+        # فشل الإشعار لا يجب أن يفشل العملية الأصلية
+        logger.error(f"Notification publish error ({event_type}): {e}")
+
+
+def alert_channels(alert: Alert) -> List[str]:
+    """التنبيه يصل لصاحبه ولشركته، وإن لم يرتبط بأي منهما يصل للجميع"""
+    channels = []
+    if alert.user_id is not None:
+        channels.append(user_channel(alert.user_id))
+    if alert.company_id is not None:
+        channels.append(company_channel(alert.company_id))
+    return channels or [BROADCAST_CHANNEL]
+
+
+def license_channels(row) -> List[str]:
+    """الرخصة تصل لشركتها، ولشركة الموظف صاحب الرخصة وحسابه إن وجد"""
+    channels = []
+    for company_id in (row.company_id, row.employee_company_id):
+        if company_id is not None:
+            channels.append(company_channel(company_id))
+    if row.user_id is not None:
+        channels.append(user_channel(row.user_id))
+    return list(dict.fromkeys(channels))
+
+
+def publish_alert_created(alert: Alert):
+    publish_event("alert.created", {
+        "id": alert.id,
+        "title": alert.title,
+        "message": alert.message,
+        "alert_type": _value(alert.alert_type),
+        "priority": _value(alert.priority),
+        "company_id": alert.company_id,
+        "employee_id": alert.employee_id,
+        "license_id": alert.license_id,
+        "related_date": alert.related_date,
+    }, alert_channels(alert))
+
+
+def publish_unread_count(db: Session, unread_count: Optional[int] = None):
+    """عدد التنبيهات غير المقروءة (نفس قيمة /api/alerts/unread/count)"""
+    if unread_count is None:
+        unread_count = db.query(Alert).filter(Alert.is_read == False).count()
+    publish_event("count.changed", {"unread_count": unread_count}, [BROADCAST_CHANNEL])
+
+
+def publish_license_expiry_batch(rows: Iterable, today: date):
+    """حدث واحد لكل قناة يحتوي كل الرخص التي تخصها في هذه الدفعة"""
+    grouped = defaultdict(list)
+    for row in rows:
+        event_type = "license.expired" if row.tier == "expired" else "license.expiring"
+        item = {
+            "id": row.id,
+            "name": row.name,
+            "license_number": row.license_number,
+            "expiry_date": row.expiry_date,
+            "days_left": (row.expiry_date - today).days,
+            "level": row.tier,
+            "company_id": row.company_id,
+            "employee_id": row.employee_id,
+        }
+        for channel in license_channels(row):
+            grouped[(event_type, channel)].append(item)
+
+    for (event_type, channel), licenses in grouped.items():
+        publish_event(event_type, {"licenses": licenses, "count": len(licenses)}, [channel])
@@ -0,0 +1,332 @@
+"""
+فهرس البحث النصي للوثائق والموظفين والرخص
+- SQLite: جدول FTS5 افتراضي، الترتيب بـ bm25
+- PostgreSQL: عمود tsvector مولد مع فهرس GIN، الترتيب بـ ts_rank
+- النص يُوحد (normalize_arabic) قبل الفهرسة وقبل البحث، ويُفهرس مع صيغ الكلمات بدون "ال"
+- الفهرس يُحدث داخل نفس الـ transaction مع كل تعديل (أحداث الـ Session)، والتعديل
+  الجماعي يعيد بناء فهرس الجدول بعد الـ commit
+
+إذا لم يتوفر الفهرس (قاعدة بيانات أخرى أو SQLite بدون FTS5) يعود البحث إلى ILIKE.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, Text, event, func, inspect, literal_column, or_, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.database.session import SessionLocal
+from app.utils.arabic import index_text, search_tokens
+
+logger = logging.getLogger(__name__)
+
+INDEX_TABLE = "search_index"
+
+# الجدول خارج Base.metadata لأن create_all لا يستطيع إنشاء جدول FTS5
+search_table = Table(
+    INDEX_TABLE, MetaData(),
+    Column("entity_type", String(20)),
+    Column("entity_id", Integer),
+    Column("title", Text),
+    Column("body", Text),
+)
+
+# الجدول -> (نوع الكيان في الفهرس، رقمه في rowid، حقول العنوان، حقول النص)
+SOURCES: Dict[str, Tuple[str, int, Tuple[str, ...], Tuple[str, ...]]] = {
+    "documents": ("document", 1, ("name",), ("description", "extracted_text")),
+    "employees": ("employee", 2, ("full_name",), ("national_id", "employee_number")),
+    "licenses": ("license", 3, ("name",), ("license_number",)),
+}
+
+# وزن العنوان مقابل النص في الترتيب
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+REBUILD_BATCH_SIZE = 1000
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+    "entity_type UNINDEXED, entity_id UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+]
+
+POSTGRES_DDL = [
+    f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+    "entity_type VARCHAR(20) NOT NULL, "
+    "entity_id INTEGER NOT NULL, "
+    "title TEXT, "
+    "body TEXT, "
+    "document tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED, "
+    "PRIMARY KEY (entity_type, entity_id))",
+    f"CREATE INDEX IF NOT EXISTS ix_search_index_document ON {INDEX_TABLE} USING GIN (document)",
+]
+
+# هل الفهرس موجود لكل قاعدة بيانات (حسب الرابط)
+_available: Dict[str, bool] = {}
+
+
+def _bind_key(bind) -> str:
+    engine = getattr(bind, "engine", bind)
+    return str(engine.url)
+
+
+def is_available(bind) -> bool:
+    """وجود جدول الفهرس في قاعدة البيانات (يُفحص مرة واحدة لكل قاعدة)"""
+    key = _bind_key(bind)
+    if key not in _available:
+        dialect = bind.dialect.name
+        engine = getattr(bind, "engine", bind)
+        try:
+            with engine.connect() as conn:
+                if dialect == "sqlite":
+                    found = conn.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": INDEX_TABLE}
+                    ).first() is not None
+                elif dialect == "postgresql":
+                    found = conn.execute(text("SELECT to_regclass(:name)"), {"name": INDEX_TABLE}).scalar() is not None
+                else:
+                    found = False
+        except DBAPIError:
+            found = False
+        _available[key] = found
+    return _available[key]
+
+
+def ensure_search_index(engine) -> bool:
+    """إنشاء جدول الفهرس إذا لم يكن موجوداً، ويعيد True إذا أصبح الفهرس متاحاً"""
+    dialect = engine.dialect.name
+    statements = SQLITE_DDL if dialect == "sqlite" else POSTGRES_DDL if dialect == "postgresql" else None
+    if statements is None:
+        logger.info(f"Full-text search index not supported on {dialect}, using ILIKE")
+        _available[_bind_key(engine)] = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    except DBAPIError as e:
+        # SQLite مبني بدون FTS5 مثلاً
+        logger.warning(f"Full-text search index unavailable, using ILIKE: {e}")
+        _available[_bind_key(engine)] = False
+        return False
+
+    _available[_bind_key(engine)] = True
+    return True
+
+
+def index_is_empty(engine) -> bool:
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT 1 FROM {INDEX_TABLE} LIMIT 1")).first() is None
+
+
+# ---------------------------------------------------------------------------
+# البحث
+# ---------------------------------------------------------------------------
+
+def match(query, model, search: str, ranked: bool = True, bind=None):
+    """تصفية استعلام النموذج بنص البحث (وترتيبه حسب الصلة إذا كان ranked)
+
+    يقبل Query أو select()، ومع select() يجب تمرير bind (محرك متزامن لنفس القاعدة).
+    """
+    source = SOURCES.get(model.__tablename__)
+    tokens = search_tokens(search)
+    if source is None or not tokens:
+        return query
+
+    entity_type, _, title_fields, body_fields = source
+    if bind is None:
+        bind = query.session.get_bind()
+    if not is_available(bind):
+        return query.filter(or_(*[
+            getattr(model, field).ilike(f"%{search}%")
+            for field in title_fields + body_fields if hasattr(model, field)
+        ]))
+
+    # المطابقة والترتيب داخل استعلام فرعي على الفهرس وحده (دوال FTS5 مثل bm25 لا
+    # تعمل مع دوال النوافذ مثل COUNT(*) OVER() في نفس الاستعلام)
+    if bind.dialect.name == "sqlite":
+        # كل كلمة كبادئة، والكلمات مجتمعة (AND)
+        expression = " ".join(f'"{token}"*' for token in tokens)
+        condition = literal_column(INDEX_TABLE).op("MATCH")(expression)
+        # bm25 أقل = أكثر صلة، الأوزان بترتيب الأعمدة
+        rank = func.bm25(literal_column(INDEX_TABLE), 0.0, 0.0, TITLE_WEIGHT, BODY_WEIGHT)
+    else:
+        tsquery = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+        document = literal_column(f"{INDEX_TABLE}.document")
+        condition = document.op("@@")(tsquery)
+        rank = -func.ts_rank(document, tsquery)
+
+    hits = select(search_table.c.entity_id, rank.label("rank")).where(
+        condition, search_table.c.entity_type == entity_type
+    ).subquery("search_hits")
+
+    query = query.join(hits, hits.c.entity_id == model.id)
+    if ranked:
+        query = query.order_by(hits.c.rank)
+    return query
+
+
+# ---------------------------------------------------------------------------
+# تحديث الفهرس
+# ---------------------------------------------------------------------------
+
+def _rowid(type_code: int, entity_id: int) -> int:
+    """rowid ثابت لكل كيان في جدول FTS5 حتى يكون الحذف بالمفتاح وليس بالبحث"""
+    return entity_id * 8 + type_code
+
+
+def _entry(tablename: str, values) -> dict:
+    entity_type, type_code, title_fields, body_fields = SOURCES[tablename]
+
+    def joined(fields):
+        return index_text(" ".join(str(values[field]) for field in fields if values.get(field)))
+
+    return {
+        "rowid": _rowid(type_code, values["id"]),
+        "entity_type": entity_type,
+        "entity_id": values["id"],
+        "title": joined(title_fields),
+        "body": joined(body_fields),
+    }
+
+
+def _delete_entries(connection, keys: Iterable[Tuple[str, int]]):
+    keys = list(keys)
+    if not keys:
+        return
+    if connection.dialect.name == "sqlite":
+        connection.execute(
+            text(f"DELETE FROM {INDEX_TABLE} WHERE rowid = :rowid"),
+            [{"rowid": _rowid(SOURCES[tablename][1], entity_id)} for tablename, entity_id in keys],
+        )
+    else:
+        connection.execute(
+            text(f"DELETE FROM {INDEX_TABLE} WHERE entity_type = :entity_type AND entity_id = :entity_id"),
+            [{"entity_type": SOURCES[tablename][0], "entity_id": entity_id} for tablename, entity_id in keys],
+        )
+
+
+def _insert_entries(connection, entries: List[dict]):
+    if not entries:
+        return
+    if connection.dialect.name == "sqlite":
+        statement = (
+            f"INSERT INTO {INDEX_TABLE} (rowid, entity_type, entity_id, title, body) "
+            "VALUES (:rowid, :entity_type, :entity_id, :title, :body)"
+        )
+    else:
+        statement = (
+            f"INSERT INTO {INDEX_TABLE} (entity_type, entity_id, title, body) "
+            "VALUES (:entity_type, :entity_id, :title, :body)"
+        )
+    connection.execute(text(statement), entries)
+
+
+def _fields(tablename: str) -> Tuple[str, ...]:
+    _, _, title_fields, body_fields = SOURCES[tablename]
+    return title_fields + body_fields
+
+
+_REBUILD_KEY = "search_index_rebuild"
+
+
+@event.listens_for(Session, "after_flush")
+def _index_flushed(session: Session, flush_context):
+    """تحديث مدخلات الفهرس للكائنات المحفوظة داخل نفس الـ transaction"""
+    removed: Set[Tuple[str, int]] = set()
+    entries: List[dict] = []
+
+    for obj in session.deleted:
+        tablename = getattr(obj, "__tablename__", None)
+        if tablename in SOURCES:
+            removed.add((tablename, obj.id))
+
+    for obj in list(session.new) + list(session.dirty):
+        tablename = getattr(obj, "__tablename__", None)
+        if tablename not in SOURCES or obj in session.deleted:
+            continue
+        fields = _fields(tablename)
+        state = inspect(obj)
+        if obj not in session.new and not any(state.attrs[field].history.has_changes() for field in fields):
+            continue
+        values = {field: getattr(obj, field) for field in fields}
+        values["id"] = obj.id
+        removed.add((tablename, obj.id))
+        entries.append(_entry(tablename, values))
+
+    if not removed:
+        return
+    connection = session.connection()
+    if not is_available(connection):
+        return
+    _delete_entries(connection, removed)
+    _insert_entries(connection, entries)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _detect_bulk_changes(orm_execute_state):
+    """التعديل الجماعي لا يمر عبر flush، لذلك يُعاد بناء فهرس الجدول بعد الـ commit"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    tablename = getattr(mapper.class_, "__tablename__", None) if mapper is not None else None
+    if tablename not in SOURCES:
+        return
+
+    if orm_execute_state.is_update:
+        values = getattr(orm_execute_state.statement, "_values", None) or {}
+        updated = {getattr(column, "key", column) for column in values}
+        if values and not updated.intersection(_fields(tablename)):
+            return
+
+    orm_execute_state.session.info.setdefault(_REBUILD_KEY, set()).add(tablename)
+
+
+@event.listens_for(Session, "after_commit")
+def _rebuild_after_bulk(session: Session):
+    tables = session.info.pop(_REBUILD_KEY, None)
+    if not tables:
+        return
+    # SessionLocal وليس bind الجلسة الحالية: مع نسخ القراءة قد يكون bind الجلسة نسخة قراءة
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db, tables)
+    except Exception as e:
+        logger.error(f"Search index rebuild error: {e}")
+    finally:
+        db.close()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rebuild(session: Session):
+    session.info.pop(_REBUILD_KEY, None)
+
+
+def rebuild_search_index(db: Session, tables: Optional[Iterable[str]] = None):
+    """إعادة بناء الفهرس بالكامل أو لجداول معينة"""
+    from app.database.base import Base
+
+    connection = db.connection()
+    if not is_available(connection):
+        return
+
+    for tablename in tables or SOURCES:
+        entity_type = SOURCES[tablename][0]
+        table = Base.metadata.tables[tablename]
+        fields = _fields(tablename)
+
+        connection.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE entity_type = :entity_type"), {"entity_type": entity_type})
+        columns = [table.c.id] + [table.c[field] for field in fields]
+        result = connection.execute(table.select().with_only_columns(*columns).execution_options(yield_per=REBUILD_BATCH_SIZE))
+        count = 0
+        for rows in result.partitions():
+            entries = [_entry(tablename, row._mapping) for row in rows]
+            _insert_entries(connection, entries)
+            count += len(entries)
+        logger.info(f"Search index rebuilt for {tablename} ({count} rows)")
+
+    db.commit()
@@ -0,0 +1,157 @@
+"""
+معاينات الوثائق المصغرة (WebP) للصور وأول صفحة من ملفات PDF
+قائمة الوثائق في الواجهة كانت تحمل الملف الأصلي كاملاً لعرض معاينة صغيرة. بعد الرفع
+تُضاف مهمة إلى process pool تنشئ المعاينات بعدة أحجام، فلا يتأثر زمن الطلب ولا
+حلقة الأحداث بفك ترميز الصور (عمل CPU يحجز الـ GIL).
+
+المعاينات تُحفظ بجانب الـ blob: uploaded_files/blobs/ab/cd/<sha256>.<الحجم>.webp،
+فهي مشتركة بين الوثائق المكررة ولا تتغير أبداً، وتُحذف مع الـ blob.
+
+Pillow مطلوب للمعاينات، و pdf2image (مع poppler) لملفات PDF. عند عدم توفرهما تفشل
+المهمة ويُسجل تحذير فقط.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Set, Tuple
+import logging
+import multiprocessing
+import os
+import threading
+
+from app.core.config import settings
+from app.services.file_storage import blob_path
+
+logger = logging.getLogger(__name__)
+
+# الاسم -> أكبر بعد بالبكسل
+THUMBNAIL_SIZES = {
+    "small": 128,
+    "medium": 320,
+    "large": 800,
+}
+
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
+WEBP_QUALITY = 80
+
+
+def preview_kind(extension: Optional[str]) -> Optional[str]:
+    """نوع المعاينة حسب امتداد الملف (None = لا توجد معاينة)"""
+    extension = (extension or "").lower().lstrip(".")
+    if extension in IMAGE_EXTENSIONS:
+        return "image"
+    if extension == "pdf":
+        return "pdf"
+    return None
+
+
+def thumbnail_path(content_hash: str, size: str) -> str:
+    return f"{blob_path(content_hash)}.{size}.webp"
+
+
+def render_thumbnails(source_path: str, kind: str, targets: Dict[str, Tuple[int, str]]) -> int:
+    """إنشاء المعاينات الناقصة (يعمل داخل process منفصل)، ويعيد عدد ما أُنشئ"""
+    from PIL import Image, ImageOps
+
+    missing = sorted(
+        (size, path) for size, path in targets.values() if not os.path.exists(path)
+    )
+    if not missing:
+        return 0
+    largest = missing[-1][0]
+
+    if kind == "pdf":
+        from pdf2image import convert_from_path
+        image = convert_from_path(source_path, first_page=1, last_page=1, size=(largest, None))[0]
+    else:
+        image = Image.open(source_path)
+        # JPEG: فك الترميز بدقة مخفضة مباشرة بدلاً من الصورة كاملة
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    # من الأكبر للأصغر، كل حجم يُصغر من السابق بدلاً من الأصل
+    for size, path in reversed(missing):
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        temp_path = f"{path}.{os.getpid()}.part"
+        image.save(temp_path, "WEBP", quality=WEBP_QUALITY)
+        os.replace(temp_path, path)
+    return len(missing)
+
+
+class ThumbnailPipeline:
+    """طابور إنشاء المعاينات في process pool، مع تجاهل المكرر أثناء التنفيذ"""
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        # الملفات التي فشلت معاينتها (ملف تالف، أو pdf2image غير متوفر) لا تُعاد في كل طلب
+        self._failed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _submit(self, *args) -> Future:
+        if self._executor is None:
+            # spawn وليس fork: العملية الرئيسية فيها threads (الـ threadpool والمهام الخلفية)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        try:
+            return self._executor.submit(render_thumbnails, *args)
+        except BrokenProcessPool:
+            # توقف أحد الـ workers بشكل مفاجئ (مثلاً نفاد الذاكرة)، نبدأ pool جديداً
+            self._discard_executor(self._executor)
+            return self._submit(*args)
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """إيقاف pool معطل واستبداله في الطلب التالي (يُستدعى مع self._lock)"""
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False)
+
+    def enqueue(self, content_hash: str, source_path: str, extension: Optional[str]) -> bool:
+        """إضافة مهمة إنشاء معاينات الملف، ويعيد False إذا لم يكن له معاينة أو فشلت سابقاً"""
+        kind = preview_kind(extension)
+        if kind is None or not content_hash or not settings.THUMBNAILS_ENABLED:
+            return False
+
+        targets = {name: (size, thumbnail_path(content_hash, name)) for name, size in THUMBNAIL_SIZES.items()}
+        with self._lock:
+            if content_hash in self._failed:
+                return False
+            if content_hash in self._pending:
+                return True
+            future = self._submit(source_path, kind, targets)
+            executor = self._executor
+            self._pending[content_hash] = future
+        future.add_done_callback(lambda done: self._finished(content_hash, done, executor))
+        return True
+
+    def _finished(self, content_hash: str, future: Future, executor: ProcessPoolExecutor):
+        error = None if future.cancelled() else future.exception()
+        # توقف worker يُفشل كل المهام الجارية في الـ pool رغم أن ملفاتها سليمة، فلا
+        # تُعتبر فاشلة وتُعاد عند الطلب التالي على pool جديد
+        broken = isinstance(error, BrokenProcessPool)
+        with self._lock:
+            self._pending.pop(content_hash, None)
+            if broken:
+                self._discard_executor(executor)
+            elif error is not None:
+                self._failed.add(content_hash)
+        if broken:
+            logger.warning(f"Thumbnail worker pool broke while rendering {content_hash[:12]}, will retry")
+        elif error is not None:
+            logger.warning(f"Thumbnail generation failed for {content_hash[:12]}: {error!r}")
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+thumbnail_pipeline = ThumbnailPipeline(settings.THUMBNAIL_WORKERS)
@@ -0,0 +1,59 @@
+"""
+توحيد النص العربي للبحث
+يحذف التشكيل والتطويل ويوحد أشكال الألف والياء والتاء المربوطة والأرقام العربية
+حتى تتطابق "أحمد" و"احمد" و"مدرسة" و"مدرسه"
+"""
+
+import re
+
+# التشكيل (الفتحة ... السكون) والألف الخنجرية
+_DIACRITICS = re.compile("[ً-ْٰ]")
+_TATWEEL = "ـ"
+
+_FOLD = str.maketrans({
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ى": "ي",
+    "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    # الأرقام العربية الهندية
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+})
+
+_WORD = re.compile(r"\w+")
+
+# أداة التعريف وحروف الجر المتصلة بها (بعد التوحيد)
+_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال", "ل")
+_MIN_STEM = 3
+
+
+def normalize_arabic(text) -> str:
+    """توحيد النص للفهرسة والمقارنة (مع الإبقاء على المسافات)"""
+    if text is None:
+        return ""
+    text = _DIACRITICS.sub("", str(text)).replace(_TATWEEL, "")
+    return text.translate(_FOLD).lower()
+
+
+def search_tokens(text) -> list:
+    """الكلمات الموحدة في نص البحث"""
+    return _WORD.findall(normalize_arabic(text))
+
+
+def strip_prefix(token: str) -> str:
+    """حذف "ال" وحروف الجر المتصلة من بداية الكلمة الموحدة"""
+    for prefix in _PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= _MIN_STEM:
+            return token[len(prefix):]
+    return token
+
+
+def index_text(text) -> str:
+    """النص الموحد مع صيغ الكلمات بدون أداة التعريف حتى تطابق مدرسة كلمة المدرسة"""
+    tokens = search_tokens(text)
+    stems = [stem for stem in (strip_prefix(token) for token in tokens) if stem not in tokens]
+    return " ".join(tokens + list(dict.fromkeys(stems)))
@@ -0,0 +1,118 @@
+"""
+خطط تنفيذ استعلامات الـ routers والخدمات (EXPLAIN QUERY PLAN)
+كل حالة تستدعي الدالة الحقيقية على قاعدة SQLite مؤقتة منشأة من النماذج، وتلتقط
+الـ SQL الذي أرسلته، ثم تتحقق أن خطته تستخدم الفهرس المتوقع دون فحص أي جدول كاملاً.
+أي تغيير في شكل الاستعلام يُفحص تلقائياً دون نسخه هنا.
+
+التشغيل (من مجلد backend):
+    python -m pytest tests/test_query_plans.py -q
+"""
+
+from contextlib import contextmanager
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.core.pagination import encode_cursor
+from app.database.base import Base
+import app.models  # noqa: F401 - تسجيل جميع النماذج
+import app.models.task  # noqa: F401
+from app.models.document import EntityType
+from app.routers import dashboard, documents, employees, licenses, tasks
+from app.services import license_expiry, notification_events
+
+# (الاسم، استدعاء الكود الحقيقي، الفهرس المتوقع في الخطة)
+CHECKS = [
+    (
+        "licenses.get_licenses_by_employee",
+        lambda db: licenses.get_licenses_by_employee(employee_id=1, db=db, current_user=None),
+        "ix_licenses_employee_id",
+    ),
+    (
+        "dashboard.get_license_expiry_alerts",
+        lambda db: dashboard.get_license_expiry_alerts(days=30, db=db, current_user=None),
+        "ix_licenses_expiry_date",
+    ),
+    (
+        "license_expiry.expire_licenses",
+        lambda db: license_expiry.expire_licenses(db, date.today()),
+        "ix_licenses_status_expiry_date",
+    ),
+    (
+        "employees.get_employees_by_company",
+        lambda db: employees.get_employees_by_company(company_id=1, db=db, current_user=None),
+        "ix_employees_company_id",
+    ),
+    (
+        "employees.get_employees (cursor page)",
+        lambda db: employees.get_employees(
+            response=Response(), skip=0, limit=100, cursor=encode_cursor({"id": 100}), search=None, db=db
+        ),
+        "PRIMARY KEY",
+    ),
+    (
+        "documents.get_documents_by_entity",
+        lambda db: documents.get_documents_by_entity(
+            entity_type=EntityType.EMPLOYEE, entity_id=1, db=db, current_user=None
+        ),
+        "ix_documents_entity_type_entity_id",
+    ),
+    (
+        "notification_events.publish_unread_count",
+        lambda db: notification_events.publish_unread_count(db),
+        "ix_alerts_is_read",
+    ),
+    (
+        "tasks.get_my_tasks",
+        lambda db: tasks.get_my_tasks(current_user=SimpleNamespace(id=1), db=db),
+        "ix_tasks_assigned_to_id",
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@contextmanager
+def captured_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def query_plan(engine, statement: str, parameters) -> list:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize("name, call, expected", CHECKS, ids=[check[0] for check in CHECKS])
+def test_query_uses_index(engine, name, call, expected):
+    with Session(engine) as db, captured_statements(engine) as statements:
+        call(db)
+        db.rollback()
+
+    assert statements, f"{name} did not run any query"
+    plans = {statement: query_plan(engine, statement, parameters) for statement, parameters in statements}
+    for statement, plan in plans.items():
+        full_scans = [step for step in plan if step.startswith("SCAN ") and "INDEX" not in step]
+        assert not full_scans, f"{name} scans a whole table:\n{statement}\n{plan}"
+    assert any(expected in step for plan in plans.values() for step in plan), (
+        f"{name} does not use {expected}:\n" + "\n".join(f"{s}\n{p}" for s, p in plans.items())
+    )